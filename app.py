@@ -1,6 +1,6 @@
 
 import streamlit as st
-from utils.ui import brand_header, render_sidebar_nav
+from utils.ui import brand_header, render_sidebar_nav, start_warm_up, metrics_panel
 
 st.set_page_config(
     page_title="影響力傳承平台｜家族影響力指數",
@@ -8,6 +8,7 @@ st.set_page_config(
     layout="wide",
 )
 
+start_warm_up()
 render_sidebar_nav()
 
 st.markdown(
@@ -49,7 +50,7 @@ with st.container():
             unsafe_allow_html=True
         )
     with col2:
-        st.info("**隱私聲明**：本平台預設不儲存個資與作答內容。如需建立專屬帳號或雲端保存，請在諮詢時另行開啟。")
+        st.info("**隱私聲明**：本平台預設不儲存個資與作答內容。僅在您勾選同意時，才會保存作答（供日後比較）或將分數匿名計入同儕比較統計。如需建立專屬帳號或雲端保存，請在諮詢時另行開啟。")
 
 st.divider()
 st.subheader("📌 建議使用方式")
@@ -71,3 +72,4 @@ with colC:
 
 st.divider()
 st.caption("影響力傳承平台｜永傳家族辦公室｜Email：123@gracefo.com")
+metrics_panel()
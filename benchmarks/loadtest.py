@@ -0,0 +1,242 @@
+"""Concurrent-session load test for the two questionnaire pages.
+
+    python -m benchmarks.loadtest --sessions 20 --duration 60 -o load.json
+    python -m benchmarks.loadtest --sessions 50 --ramp 30 --pages 01 --think 2
+    python -m benchmarks.loadtest --url http://127.0.0.1:8501 --pid 12345 -n 20
+
+Starts `streamlit run app.py` headless on a free local port (or uses --url)
+and drives it with N simulated browser sessions over Streamlit's websocket
+protocol. A session opens a page, then keeps answering every question at
+random and clicking the form's submit button, waiting `--think` seconds
+between submits. Latency is measured from sending the rerun to the server's
+script-finished message, i.e. what a user waits for after clicking.
+
+Reported per page and overall: p50/p95/p99/max latency, errors and
+throughput, plus the server's resident memory sampled every `--sample`
+seconds (Linux /proc), so memory growth over the run is visible. Size
+replicas from the session count where p95 stops being acceptable; run it
+once per CPU/memory shape. Needs `websockets` (installed with Streamlit).
+"""
+import argparse, asyncio, json, os, pathlib, random, socket, subprocess, sys, time, urllib.request
+from collections import Counter
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+PAGES = {"01": "family_impact", "02": "legacy_readiness"}    # url path names of pages/01_*.py, pages/02_*.py
+
+def rss_mib(pid) -> float | None:
+    try:
+        with open(f"/proc/{pid}/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+class Session:
+    """A minimal headless Streamlit client on one page."""
+
+    def __init__(self, ws_url: str, page: str, rng: random.Random, timeout: float):
+        self.ws_url, self.page, self.rng, self.timeout = ws_url, page, rng, timeout
+        self.page_hash, self.widgets = "", {}
+
+    async def __aenter__(self):
+        import websockets
+        self.ws = await asyncio.wait_for(websockets.connect(self.ws_url, subprotocols=["streamlit"], max_size=None), self.timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.ws.close()
+
+    async def rerun(self, states=()) -> str | None:
+        """Send one rerun and wait for the script to finish; returns the app error, if any."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        msg = BackMsg()
+        msg.rerun_script.page_script_hash = self.page_hash
+        msg.rerun_script.page_name = "" if self.page_hash else self.page
+        msg.rerun_script.widget_states.widgets.extend(states)
+        await self.ws.send(msg.SerializeToString())
+        error, widgets = None, {}
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await asyncio.wait_for(self.ws.recv(), self.timeout))
+            kind = fwd.WhichOneof("type")
+            if kind == "navigation":      # the page actually run; later reruns address it by hash
+                self.page_hash = fwd.navigation.page_script_hash
+            elif kind == "page_not_found":
+                error = f"page not found: {self.page}"
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                etype = element.WhichOneof("type")
+                if etype == "exception":
+                    error = error or f"{element.exception.type}: {element.exception.message}"
+                elif etype in ("radio", "selectbox", "button"):
+                    proto = getattr(element, etype)
+                    widgets[proto.id] = (etype, proto)
+            elif kind == "script_finished" and fwd.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                self.widgets = widgets
+                return error
+
+    def submit_states(self):
+        """A random answer for every radio, the shown choice for selectboxes, and the submit click."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        states = []
+        for wid, (etype, proto) in self.widgets.items():
+            if etype == "radio" and proto.options:
+                states.append(WidgetState(id=wid, string_value=self.rng.choice(proto.options)))
+            elif etype == "selectbox" and proto.options:
+                states.append(WidgetState(id=wid, string_value=proto.options[proto.default]))
+            elif etype == "button" and proto.is_form_submitter:
+                states.append(WidgetState(id=wid, trigger_value=True))
+        if not any(s.HasField("trigger_value") for s in states):
+            raise RuntimeError("no submit button on the page")
+        return states
+
+class Recorder:
+    def __init__(self):
+        self.samples = []      # (kind, page, seconds, ok)
+        self.memory = []       # (t, rss MiB)
+        self.errors = Counter()
+
+    def add(self, kind, page, seconds, error=None):
+        self.samples.append((kind, page, seconds, error is None))
+        if error:
+            self.errors[f"{page} {kind}: {error}"[:300]] += 1
+
+async def session(rec, ws_url, page, stop, seed, think, timeout):
+    """One simulated user; reconnects if the connection drops or a rerun times out."""
+    rng = random.Random(seed)
+    while not stop.is_set():
+        t0, kind = time.perf_counter(), "connect"
+        try:
+            async with Session(ws_url, page, rng, timeout) as s:
+                kind = "open"
+                rec.add("open", page, time.perf_counter() - t0, await s.rerun())
+                while not stop.is_set():
+                    states, kind = s.submit_states(), "submit"
+                    t0 = time.perf_counter()
+                    error = await s.rerun(states)
+                    rec.add("submit", page, time.perf_counter() - t0, error)
+                    if think:
+                        try:
+                            await asyncio.wait_for(stop.wait(), rng.uniform(0.5, 1.5) * think)
+                        except asyncio.TimeoutError:
+                            pass
+        except Exception as e:
+            rec.add(kind, page, time.perf_counter() - t0, repr(e))
+            await asyncio.sleep(0.5)
+
+def summarize(samples, kind, wall, page=None):
+    rows = [s for s in samples if s[0] == kind and (page is None or s[1] == page)]
+    times = sorted(s[2] for s in rows if s[3])
+    ms = lambda v: None if v is None else round(v * 1000, 1)
+    return {
+        "count": len(times), "errors": len(rows) - len(times),
+        "throughput_per_s": round(len(times) / wall, 2) if wall else None,
+        "p50_ms": ms(percentile(times, 50)), "p95_ms": ms(percentile(times, 95)),
+        "p99_ms": ms(percentile(times, 99)), "max_ms": ms(times[-1] if times else None),
+    }
+
+async def run(ws_url, pid, sessions, duration, pages, ramp=0.0, think=0.0, sample=1.0, timeout=120, seed=0):
+    rec, stop = Recorder(), asyncio.Event()
+    start = time.perf_counter()
+
+    async def sampler():
+        while not stop.is_set():
+            rec.memory.append((round(time.perf_counter() - start, 2), rss_mib(pid)))
+            try:
+                await asyncio.wait_for(stop.wait(), sample)
+            except asyncio.TimeoutError:
+                pass
+    tasks = [asyncio.create_task(sampler())]
+    for i in range(sessions):
+        tasks.append(asyncio.create_task(session(rec, ws_url, pages[i % len(pages)], stop, seed + i, think, timeout)))
+        if ramp and i < sessions - 1:
+            await asyncio.sleep(ramp / sessions)
+    await asyncio.sleep(max(0.0, duration - (time.perf_counter() - start)))
+    stop.set()
+    await asyncio.wait(tasks, timeout=timeout)
+    for t in tasks:
+        t.cancel()
+    wall = time.perf_counter() - start
+    rec.memory.append((round(wall, 2), rss_mib(pid)))
+
+    memory = [(t, round(m, 1)) for t, m in rec.memory if m is not None]
+    return {
+        "config": {"sessions": sessions, "duration_s": duration, "ramp_s": ramp, "think_s": think, "pages": pages},
+        "wall_s": round(wall, 2),
+        "open": summarize(rec.samples, "open", wall),
+        "submit": summarize(rec.samples, "submit", wall),
+        "by_page": {p: summarize(rec.samples, "submit", wall, p) for p in pages},
+        "connect_errors": summarize(rec.samples, "connect", wall)["errors"],
+        "errors": dict(rec.errors.most_common()),
+        "rss_mib": {"start": memory[0][1], "end": memory[-1][1], "max": max(m for _, m in memory),
+                    "growth": round(memory[-1][1] - memory[0][1], 1), "samples": memory} if memory else None,
+    }
+
+def start_server(wait=60.0):
+    """`streamlit run app.py` headless on a free 127.0.0.1 port; returns (process, base url) once healthy."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0)); port = s.getsockname()[1]
+    env = {**os.environ, "MPLBACKEND": "Agg"}
+    proc = subprocess.Popen([sys.executable, "-m", "streamlit", "run", "app.py", "--server.headless", "true",
+                             "--server.address", "127.0.0.1", "--server.port", str(port),
+                             "--browser.gatherUsageStats", "false"],
+                            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base, deadline = f"http://127.0.0.1:{port}", time.time() + wait
+    while time.time() < deadline and proc.poll() is None:
+        try:
+            with urllib.request.urlopen(f"{base}/_stcore/health", timeout=1):
+                return proc, base
+        except OSError:
+            time.sleep(0.3)
+    proc.terminate()
+    raise RuntimeError("streamlit server did not start")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Drive the questionnaire pages with N concurrent simulated sessions.")
+    ap.add_argument("--sessions", "-n", type=int, default=10)
+    ap.add_argument("--duration", "-d", type=float, default=30, help="seconds to keep submitting")
+    ap.add_argument("--ramp", type=float, default=0, help="spread session start-up over this many seconds")
+    ap.add_argument("--think", type=float, default=0, help="mean pause between a session's submits (seconds)")
+    ap.add_argument("--pages", nargs="+", choices=sorted(PAGES), default=sorted(PAGES), help="page numbers to drive")
+    ap.add_argument("--url", help="drive a running server instead of starting one")
+    ap.add_argument("--pid", type=int, help="server process id, for memory sampling with --url")
+    ap.add_argument("--sample", type=float, default=1.0, help="memory sampling interval (seconds)")
+    ap.add_argument("--timeout", type=float, default=120, help="seconds to wait for one rerun")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o", "--out", help="write the full result (including the memory timeline) as JSON")
+    args = ap.parse_args(argv)
+
+    server, base, pid = None, (args.url or "").rstrip("/"), args.pid
+    if not args.url:
+        server, base = start_server()
+        pid = server.pid
+    ws_url = "ws" + base[len("http"):] + "/_stcore/stream"
+    try:
+        result = asyncio.run(run(ws_url, pid, args.sessions, args.duration, [PAGES[p] for p in args.pages],
+                                 args.ramp, args.think, args.sample, args.timeout, args.seed))
+    finally:
+        if server is not None:
+            server.terminate(); server.wait(30)
+
+    print(f"{args.sessions} sessions, {result['wall_s']} s")
+    for name, s in [("open", result["open"]), ("submit", result["submit"])] + list(result["by_page"].items()):
+        print(f"{name:18s} n={s['count']:<5d} err={s['errors']:<3d} {s['throughput_per_s'] or 0:6.2f}/s  "
+              f"p50 {s['p50_ms']} ms  p95 {s['p95_ms']} ms  p99 {s['p99_ms']} ms  max {s['max_ms']} ms")
+    if result["connect_errors"]:
+        print(f"connection errors: {result['connect_errors']}")
+    m = result["rss_mib"]
+    if m:
+        print(f"server rss: start {m['start']} MiB, end {m['end']} MiB, max {m['max']} MiB, growth {m['growth']} MiB")
+    for message, n in list(result["errors"].items())[:5]:
+        print(f"error x{n}: {message}")
+    if args.out:
+        pathlib.Path(args.out).write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 1 if result["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""Per-stage timing and memory benchmarks.
+
+    python -m benchmarks.run -o bench.json                 # run everything, save results
+    python -m benchmarks.run --baseline bench.json         # compare, exit 1 on regressions
+    python -m benchmarks.run -k pdf -k chart --repeat 50   # only matching stages
+
+Each stage is timed separately (wall clock over `repeat` runs after a warm-up)
+and its peak Python allocation is measured with tracemalloc in one extra run,
+so tracing does not skew the timings. Set-up work (random answers, figure
+construction for the PNG stages, AppTest script start-up for page stages)
+is done outside the timed region. Page stages time one submit rerun of each
+questionnaire page through Streamlit's AppTest with the render cache cleared.
+
+Optional stores/caches (IMPACT_*_PATH/DIR) are switched off for the run so
+results do not depend on local state.
+"""
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")
+os.environ.setdefault("IMPACT_WARM_UP", "0")      # stages warm themselves up; no competing background thread
+for _var in ("IMPACT_OUTCOME_TABLE_DIR", "IMPACT_RENDER_CACHE_DIR", "IMPACT_STORE_PATH", "IMPACT_COHORT_PATH"):
+    os.environ.pop(_var, None)
+
+import argparse, fnmatch, io, json, logging, pathlib, platform, statistics, subprocess, sys, time, tracemalloc, warnings
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+STAGES = {}
+
+def stage(name, repeat=None):
+    """Register `fn(rng) -> run` as a stage; `run()` is the timed call."""
+    def deco(fn):
+        STAGES[name] = (fn, repeat)
+        return fn
+    return deco
+
+def _answers(rng, questionnaire):
+    return rng.integers(1, 6, len(questionnaire.questions)).tolist()
+
+@stage("score.family_impact")
+def _score_fi(rng):
+    from utils.questionnaires import FAMILY_IMPACT
+    from utils.scoring import compute_family_impact_scores
+    answers = _answers(rng, FAMILY_IMPACT)
+    return lambda: compute_family_impact_scores(FAMILY_IMPACT, answers)
+
+@stage("score.legacy_readiness")
+def _score_lr(rng):
+    from utils.questionnaires import LEGACY_READINESS
+    from utils.scoring import compute_legacy_readiness
+    answers = _answers(rng, LEGACY_READINESS)
+    return lambda: compute_legacy_readiness(LEGACY_READINESS, answers)
+
+def _fi_scores(rng):
+    from utils.questionnaires import FAMILY_IMPACT
+    from utils.scoring import compute_family_impact_scores
+    return compute_family_impact_scores(FAMILY_IMPACT, _answers(rng, FAMILY_IMPACT))[0]
+
+def _lr_risk(rng):
+    from utils.questionnaires import LEGACY_READINESS
+    from utils.scoring import compute_legacy_readiness
+    return compute_legacy_readiness(LEGACY_READINESS, _answers(rng, LEGACY_READINESS))[1]
+
+@stage("chart.radar_plot")
+def _radar(rng):
+    from utils.charts import radar_plot
+    scores = _fi_scores(rng)
+    return lambda: radar_plot(scores).clear()
+
+@stage("chart.heatmap_from_dict")
+def _heatmap(rng):
+    from utils.charts import heatmap_from_dict
+    risk = _lr_risk(rng)
+    return lambda: heatmap_from_dict(risk).clear()
+
+@stage("png.radar_savefig_200dpi")
+def _radar_png(rng):
+    from utils.charts import radar_plot
+    fig = radar_plot(_fi_scores(rng))
+    return lambda: fig.savefig(io.BytesIO(), format="png", dpi=200, bbox_inches="tight")
+
+@stage("png.heatmap_savefig_200dpi")
+def _heatmap_png(rng):
+    from utils.charts import heatmap_from_dict
+    fig = heatmap_from_dict(_lr_risk(rng))
+    return lambda: fig.savefig(io.BytesIO(), format="png", dpi=200, bbox_inches="tight")
+
+def _pdf_stage(rows):
+    def setup(rng):
+        import pandas as pd
+        from utils.pdf_utils import build_report
+        from utils.pdf_charts import radar_drawing
+        from utils.fonts import pdf_font_name
+        from utils.scoring import interpret_scores
+        scores = _fi_scores(rng)
+        df = pd.DataFrame({
+            "面向": [f"面向 {i + 1}" for i in range(rows)],
+            "總分(滿分15)": rng.integers(3, 16, rows),
+            "平均(1-5)": rng.uniform(1, 5, rows).round(2),
+        })
+        chart, advice = radar_drawing(scores, pdf_font_name()), interpret_scores(scores)
+        return lambda: build_report("家族影響力指數｜分析報告", "雷達圖・面向分析・顧問下一步建議", "摘要",
+                                    advice, [("分數明細", df)], [("家族影響力雷達圖", chart)])
+    return setup
+
+for _rows in (1, 10, 100):
+    stage(f"pdf.build_report_{_rows}_rows")(_pdf_stage(_rows))
+
+@stage("pdf.cohort_report_100_families", repeat=5)
+def _cohort_pdf(rng):
+    import pandas as pd
+    from utils.questionnaires import FAMILY_IMPACT
+    from utils.cohort_report import cohort_report
+    n = len(FAMILY_IMPACT.questions)
+    families = np.repeat([f"F{i:03d}" for i in range(100)], 3)
+    df = pd.DataFrame(rng.integers(1, 6, (len(families), n)), columns=[f"Q{i}" for i in range(1, n + 1)])
+    df.insert(0, "family_id", families)
+    data = df.to_csv(index=False).encode("utf-8")
+    def run():
+        src = io.BytesIO(data); src.name = "cohort.csv"
+        for _ in cohort_report(src, "family_impact", io.BytesIO()):
+            pass
+    return run
+
+def _page_stage(page):
+    def setup(rng):
+        from streamlit.testing.v1 import AppTest
+        from utils.render_cache import render_cache
+        at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=120).run()
+        at.switch_page(page).run()
+        for r in at.radio:
+            r.set_value(int(rng.integers(1, 6)))
+        submit = next(b for b in at.button if "立即" in b.label)
+        render_cache.clear()
+        def run():
+            submit.click().run()
+            if at.exception:
+                raise RuntimeError(f"{page}: {at.exception[0].message}")
+        return run
+    return setup
+
+stage("app.family_impact_submit", repeat=5)(_page_stage("pages/01_family_impact.py"))
+stage("app.legacy_readiness_submit", repeat=5)(_page_stage("pages/02_legacy_readiness.py"))
+
+def measure(setup, repeat, seed=0):
+    """Time `repeat` fresh runs of a stage, then one traced run for peak memory."""
+    rng = np.random.default_rng(seed)
+    setup(rng)()                      # warm-up: imports, font resolution, caches
+    times = []
+    for _ in range(repeat):
+        run = setup(rng)
+        t0 = time.perf_counter(); run(); times.append(time.perf_counter() - t0)
+    run = setup(rng)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    ms = sorted(t * 1000 for t in times)
+    return {
+        "repeat": repeat,
+        "min_ms": round(ms[0], 3),
+        "median_ms": round(statistics.median(ms), 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(0.95 * len(ms)))], 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+def environment():
+    import importlib.metadata as md
+    def version(pkg):
+        try:
+            return md.version(pkg)
+        except md.PackageNotFoundError:
+            return None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": {p: version(p) for p in ("streamlit", "matplotlib", "reportlab", "numpy", "pandas")},
+    }
+
+def compare(results, baseline, threshold, min_delta_ms=1.0):
+    """Rows of (stage, baseline ms, current ms, ratio, regressed) on median time.
+
+    A stage regresses when it is both `threshold` relatively and `min_delta_ms`
+    absolutely slower, so sub-millisecond noise does not fail a run."""
+    rows = []
+    for name, cur in results.items():
+        old = baseline.get("results", {}).get(name)
+        if old:
+            ratio = cur["median_ms"] / max(old["median_ms"], 1e-9)
+            rows.append((name, old["median_ms"], cur["median_ms"], ratio, ratio > 1 + threshold and cur["median_ms"] - old["median_ms"] > min_delta_ms))
+    return rows
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Time and measure memory for each report-generation stage.")
+    ap.add_argument("-k", dest="patterns", action="append", help="only stages whose name contains/matches this (repeatable)")
+    ap.add_argument("--repeat", type=int, help="timed runs per stage (default 20; 5 for page stages)")
+    ap.add_argument("-o", "--out", help="write results as JSON")
+    ap.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    ap.add_argument("--threshold", type=float, default=0.2, help="allowed median slowdown before failing (default 0.2 = 20%%)")
+    ap.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this (default 1 ms)")
+    ap.add_argument("--list", action="store_true", help="list stages and exit")
+    args = ap.parse_args(argv)
+
+    names = [n for n in STAGES if not args.patterns or any(p in n or fnmatch.fnmatch(n, p) for p in args.patterns)]
+    if args.list:
+        print("\n".join(names)); return 0
+    sys.path.insert(0, str(ROOT)); os.chdir(ROOT)   # pages resolve utils/ and logo files from the repo root
+    warnings.filterwarnings("ignore"); logging.disable(logging.WARNING)
+
+    results = {}
+    for name in names:
+        setup, repeat = STAGES[name]
+        results[name] = r = measure(setup, args.repeat or repeat or 20)
+        print(f"{name:32s} median {r['median_ms']:9.2f} ms  p95 {r['p95_ms']:9.2f} ms  peak {r['peak_kib']:9.1f} KiB", file=sys.stderr)
+
+    report = {"environment": environment(), "results": results}
+    if args.out:
+        pathlib.Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(pathlib.Path(args.baseline).read_text(encoding="utf-8"))
+        rows = compare(results, baseline, args.threshold, args.min_delta_ms)
+        print(f"\n{'stage':32s} {'baseline':>10s} {'current':>10s} {'ratio':>7s}")
+        for name, old, cur, ratio, bad in rows:
+            print(f"{name:32s} {old:10.2f} {cur:10.2f} {ratio:7.2f}{'  REGRESSION' if bad else ''}")
+        if any(r[-1] for r in rows):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+
+import streamlit as st
+from utils.ui import brand_header, render_sidebar_nav, start_warm_up, is_admin, metrics_panel
+from utils.questionnaires import REGISTRY
+
+st.set_page_config(page_title="家族彙整批次作業", page_icon="logo2.png", layout="wide")
+start_warm_up()
+render_sidebar_nav()
+brand_header("家族彙整批次作業（顧問專用）")
+
+if not is_admin():
+    st.warning("此頁面僅供顧問使用，請由顧問專用連結開啟。")
+    metrics_panel()
+    st.stop()
+
+from utils.jobs import get_queue
+
+# Jobs run in worker processes and keep their state on disk; the page only
+# submits and polls, and ?job=<id> brings a job back after reruns or reconnects.
+jobs = get_queue()
+STATUS = {"queued": "排隊中", "running": "處理中", "done": "已完成", "failed": "失敗"}
+PHASES = {"scoring": "評分中", "report": "產生家族報告中"}
+DOWNLOADS = [("report", "下載家族彙整報告（PDF）", "application/pdf"),
+             ("scores", "下載受訪者分數（CSV）", "text/csv"),
+             ("facets", "下載面向分數明細（CSV）", "text/csv")]
+
+with st.form("job_upload"):
+    qkey = st.selectbox("問卷", list(REGISTRY), format_func=lambda k: REGISTRY[k].title, key="job_questionnaire")
+    family_column = st.text_input("家族代號欄位（同一家族的資料列需相鄰）", value="family_id", key="job_family_column")
+    st.caption("檔案需含 Q1–Qn 欄位（1-5 分），可加上 respondent_id 與家族代號欄位；支援 CSV / Excel / Parquet。")
+    upload = st.file_uploader("上傳作答檔", type=["csv", "xlsx", "parquet"], key="job_upload_file")
+    submitted = st.form_submit_button("開始處理", use_container_width=True)
+
+if submitted and upload is None:
+    st.warning("請先選擇檔案。")
+elif submitted:
+    jid, created = jobs.submit(qkey, upload.name, upload.getvalue(), family_column.strip() or "family_id")
+    st.query_params["job"] = jid
+    if not created:
+        st.info("這個檔案已經處理過（或正在處理），以下為既有的作業。")
+
+def _state_line(state):
+    line = f"{state['name']}｜{REGISTRY[state['questionnaire']].title}｜{STATUS.get(state['status'], state['status'])}"
+    return line + ("（已中斷）" if jobs.stale(state) else "")
+
+@st.fragment(run_every=2)
+def job_progress(jid):
+    """Re-run every 2 s on its own; the full page reruns once the job stops running."""
+    state = jobs.state(jid)
+    if state is None or state["status"] not in ("queued", "running") or jobs.stale(state):
+        st.rerun()
+    if state["status"] == "queued":
+        st.progress(0.0, text="排隊中…")
+    elif state.get("phase") == "scoring":
+        st.progress(0.05, text=f"{PHASES['scoring']}：已處理 {state.get('done', 0):,} 筆")
+    else:
+        total = max(1, state.get("total") or 1)
+        st.progress(min(1.0, 0.1 + 0.9 * state.get("done", 0) / total),
+                    text=f"{PHASES['report']}：{state.get('families', 0):,} 個家族，{state.get('done', 0):,} / {total:,} 位受訪者")
+
+jid = st.query_params.get("job")
+if jid:
+    state = jobs.state(jid)
+    st.divider()
+    if state is None:
+        st.error("找不到這個作業。")
+    else:
+        st.subheader(_state_line(state))
+        st.caption(f"作業代號：{jid}")
+        if state["status"] == "done":
+            c1, c2 = st.columns(2)
+            c1.metric("家族數", f"{state.get('families', 0):,}")
+            c2.metric("受訪人數", f"{state.get('done', 0):,}")
+            for kind, label, mime in DOWNLOADS:
+                path = jobs.output(jid, kind)
+                if path.exists():
+                    # read from disk only when clicked
+                    st.download_button(label, data=lambda p=path: p.read_bytes(), file_name=f"{jid[:8]}_{path.name}",
+                                       mime=mime, on_click="ignore", use_container_width=True, key=f"dl_{kind}")
+            with st.expander("預覽受訪者分數（前 20 筆）"):
+                import pandas as pd
+                st.dataframe(pd.read_csv(jobs.output(jid, "scores"), nrows=20), hide_index=True, use_container_width=True)
+        elif state["status"] == "failed" or jobs.stale(state):
+            st.error(f"作業未完成：{state.get('error') or '處理程序已中斷'}。重新上傳同一檔案即可重新執行。")
+        else:
+            job_progress(jid)
+
+recent = jobs.recent()
+if recent:
+    st.divider()
+    st.subheader("最近的作業")
+    for s in recent:
+        if st.button(_state_line(s), key=f"open_{s['id']}", use_container_width=True):
+            st.query_params["job"] = s["id"]
+            st.rerun()
+
+metrics_panel()
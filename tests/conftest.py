@@ -0,0 +1,8 @@
+import os, pathlib, sys
+
+# utils/ is imported from the repo root, as the pages and CLIs do.
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MPLBACKEND", "Agg")
+os.environ["IMPACT_WARM_UP"] = "0"
+for _var in ("IMPACT_OUTCOME_TABLE_DIR", "IMPACT_RENDER_CACHE_DIR", "IMPACT_STORE_PATH", "IMPACT_COHORT_PATH", "IMPACT_JOBS_DIR"):
+    os.environ.pop(_var, None)
@@ -0,0 +1,72 @@
+import itertools
+import numpy as np
+import pytest
+from utils.questionnaires import FAMILY_IMPACT, LEGACY_READINESS
+from utils.advice import FAMILY_IMPACT_ADVICE, LEGACY_READINESS_ACTIONS, advice_texts, compile_rules, evaluate, evaluate_one
+from utils.scoring import interpret_scores, legacy_readiness_summary
+
+def old_interpret(avg):
+    """The hand-written thresholds the rule table replaced."""
+    advice = []
+    if avg.get("情感連結", 0) < 3:
+        advice.append("• 先安排一次以「價值觀與家族期待」為主的會議，避免一開始聚焦在稅務或產品。")
+    if avg.get("財務參與度", 0) < 3.5:
+        advice.append("• 建立資產列表與決策流程（誰參與、如何紀錄），提升透明度與參與感。")
+    if avg.get("家族角色認同", 0) < 3.5:
+        advice.append("• 明確界定角色與授權（董事會、家族委員會、受託人等），降低決策壓力集中。")
+    if avg.get("傳承願景", 0) < 3.5:
+        advice.append("• 用 OKR/願景版把 3-5 年目標寫下來，安排交棒時程與里程碑。")
+    if not advice:
+        advice.append("• 建議直接進入《傳承策略設計》與保單/信託現金流模型，建立長期護城河。")
+    advice.append("• 若需協助，我們可提供顧問會議與策略落地服務（Email：123@gracefo.com）。")
+    return "\n".join(advice)
+
+def old_actions(risk):
+    actions = []
+    if risk.get("資產透明度", 0) >= 1.0:
+        actions.append("• 建立最新資產清單與權屬（含跨境資產），指定維護頻率與責任人。")
+    if risk.get("稅務與合規", 0) >= 1.0:
+        actions.append("• 進行跨境稅務/申報盤點（CRS/FBAR/遺贈稅），建立年度合規清單。")
+    if risk.get("接班計畫", 0) >= 1.0:
+        actions.append("• 設定交棒時程表與角色授權，建立家族治理/董事會會議節奏。")
+    if risk.get("保險與信託", 0) >= 1.0:
+        actions.append("• 用保單/信託打造長期現金流與風險隔離，定期壓力測試。")
+    if not actions:
+        actions.append("• 建議直接進入《傳承策略設計》與現金流模型優化，建立長期護城河。")
+    actions.append("• 需要協助？來信 123@gracefo.com 安排顧問會議。")
+    return "\n".join(actions)
+
+# every threshold, just below and just above it, plus the ends of the scale
+VALUES = [1.0, 2.99, 3.0, 3.01, 3.49, 3.5, 3.51, 5.0]
+RISKS = [0.0, 0.99, 1.0, 1.01, 4.0]
+
+def test_family_impact_rules_match_old_thresholds():
+    for combo in itertools.product(VALUES, repeat=len(FAMILY_IMPACT.facets)):
+        avg = dict(zip(FAMILY_IMPACT.facets, combo))
+        assert interpret_scores({f: {"avg": v} for f, v in avg.items()}) == old_interpret(avg)
+
+def test_legacy_readiness_rules_match_old_thresholds():
+    for combo in itertools.product(RISKS, repeat=len(LEGACY_READINESS.facets)):
+        risk = dict(zip(LEGACY_READINESS.facets, combo))
+        assert legacy_readiness_summary(risk)[2] == old_actions(risk)
+
+def test_missing_facets_count_as_zero():
+    assert interpret_scores({}) == old_interpret({})
+    assert legacy_readiness_summary({"接班計畫": 2.0})[2] == old_actions({"接班計畫": 2.0})
+
+@pytest.mark.parametrize("rules", [FAMILY_IMPACT_ADVICE, LEGACY_READINESS_ACTIONS], ids=lambda r: r.questionnaire.key)
+def test_vectorized_evaluate_matches_one_by_one(rules):
+    q = rules.questionnaire
+    values = np.random.default_rng(0).choice(VALUES + RISKS, (500, len(q.facets)))
+    hits = evaluate(rules, values)
+    for row, hit in zip(values, hits):
+        assert hit.tolist() == evaluate_one(rules, dict(zip(q.facets, row))).tolist()
+    texts = advice_texts(rules, hits)
+    old = old_interpret if q.key == "family_impact" else old_actions
+    assert texts == [old(dict(zip(q.facets, row))) for row in values]
+
+def test_compile_rules_rejects_bad_rows():
+    with pytest.raises(ValueError):
+        compile_rules(FAMILY_IMPACT, "avg", [("nope", "<", 3, "x")], "f", "z")
+    with pytest.raises(ValueError):
+        compile_rules(FAMILY_IMPACT, "avg", [("情感連結", "<=", 3, "x")], "f", "z")
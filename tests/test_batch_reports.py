@@ -0,0 +1,17 @@
+import pandas as pd
+from utils.batch_reports import _unique_names, generate_reports
+
+def test_colliding_ids_get_distinct_names():
+    used = set()
+    first = _unique_names("fi", ["a", "a", "a b", "a_b", "", "?"], 1, used)
+    assert first == ["fi_a.pdf", "fi_a_row2.pdf", "fi_a_b.pdf", "fi_a_b_row4.pdf", "fi_respondent.pdf", "fi_respondent_row6.pdf"]
+    later = _unique_names("fi", ["a", "a_row2"], 7, used)           # names stay unique across chunks
+    assert len(set(first + later)) == 8
+
+def test_duplicate_ids_do_not_overwrite_reports(tmp_path):
+    df = pd.DataFrame([[3] * 12, [4] * 12, [5] * 12], columns=[f"Q{i}" for i in range(1, 13)])
+    df.insert(0, "respondent_id", ["x", "x", "x"])
+    df.to_csv(tmp_path / "in.csv", index=False)
+    paths = list(generate_reports(tmp_path / "in.csv", "family_impact", tmp_path / "out", workers=1))
+    assert len(set(paths)) == 3
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ["family_impact_x.pdf", "family_impact_x_row2.pdf", "family_impact_x_row3.pdf"]
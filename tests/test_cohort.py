@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from utils.cohort import MIN_COHORT, Cohort, histogram, percentiles
+from utils.questionnaires import LEGACY_READINESS
+
+Q = LEGACY_READINESS
+
+def naive_percentiles(sample, sums):
+    """Mid-rank percentile straight from the raw facet sums."""
+    return [100.0 * ((col < s).sum() + 0.5 * (col == s).sum()) / len(col) for col, s in zip(sample.T, sums)]
+
+@pytest.fixture
+def sample():
+    answers = np.random.default_rng(0).integers(1, 6, (300, len(Q.questions)))
+    return answers @ Q.onehot
+
+def test_histogram_percentiles_match_raw_sample(sample):
+    hist = histogram(Q, sample)
+    assert hist.sum(axis=1).tolist() == [len(sample)] * len(Q.facets)
+    for sums in sample[:50]:
+        assert np.allclose(percentiles(hist, sums), naive_percentiles(sample, sums))
+    lo, hi = Q.facet_counts, Q.max_scores
+    assert (percentiles(hist, lo) <= percentiles(hist, hi)).all()
+
+@pytest.fixture
+def cohort(tmp_path):
+    c = Cohort(tmp_path / "cohort.db", flush_interval=60)
+    yield c
+    c.close()
+
+def test_hidden_below_min_cohort(cohort, sample):
+    for sums in sample[:MIN_COHORT - 1]:
+        cohort.add(Q.key, sums)
+    assert cohort.percentiles(Q.key, sample[0]) is None
+    cohort.add(Q.key, sample[MIN_COHORT - 1])
+    assert np.allclose(cohort.percentiles(Q.key, sample[0]), naive_percentiles(sample[:MIN_COHORT], sample[0]))
+
+def test_resubmit_and_withdraw(cohort, sample):
+    for sums in sample[:MIN_COHORT]:
+        cohort.add(Q.key, sums)
+    cohort.add(Q.key, sample[MIN_COHORT], previous=sample[0])      # revised answers replace the first ones
+    assert cohort.size(Q.key) == MIN_COHORT
+    kept = sample[1:MIN_COHORT + 1]
+    assert np.allclose(cohort.percentiles(Q.key, sample[5]), naive_percentiles(kept, sample[5]))
+    cohort.remove(Q.key, sample[MIN_COHORT])
+    assert cohort.size(Q.key) == MIN_COHORT - 1
+
+def test_processes_share_counts_through_the_file(tmp_path, sample):
+    a, b = Cohort(tmp_path / "c.db", flush_interval=60), Cohort(tmp_path / "c.db", flush_interval=60)
+    try:
+        for sums in sample[:15]:
+            a.add(Q.key, sums)
+        b.merge(Q.key, histogram(Q, sample[15:40]))
+        b.remove(Q.key, sample[39])
+        a.flush(); b.flush(); a.flush()
+        assert a.size(Q.key) == b.size(Q.key) == 39
+        assert np.allclose(a.percentiles(Q.key, sample[3]), naive_percentiles(sample[:39], sample[3]))
+    finally:
+        a.close(); b.close()
+
+def test_revision_tracks_changes_to_the_totals(tmp_path, sample):
+    a, b = Cohort(tmp_path / "c.db", flush_interval=60), Cohort(tmp_path / "c.db", flush_interval=60)
+    try:
+        seen = a.revision(Q.key)
+        a.add(Q.key, sample[0])
+        assert a.revision(Q.key) > seen
+        seen = a.revision(Q.key)
+        a.flush(); a.flush()                                 # nothing new from the file
+        assert a.revision(Q.key) == seen
+        b.merge(Q.key, histogram(Q, sample[1:5]))
+        b.flush(); a.flush()                                 # another process's counts arrive
+        assert a.revision(Q.key) > seen and a.size(Q.key) == 5
+        seen = a.revision(Q.key)
+        a.remove(Q.key, sample[0])
+        assert a.revision(Q.key) > seen
+    finally:
+        a.close(); b.close()
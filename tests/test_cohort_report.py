@@ -0,0 +1,83 @@
+import re
+import numpy as np
+import pandas as pd
+import pytest
+from utils.cohort_report import CohortTotals, cohort_report, iter_families
+from utils.pdf_utils import ReportWriter
+from utils.pipeline import answer_columns
+from utils.questionnaires import FAMILY_IMPACT
+
+Q = FAMILY_IMPACT
+
+def _pages(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b", pdf))
+
+@pytest.fixture
+def families(tmp_path):
+    """CSV of families a (3 members), b (1), c (2), a again (1, not adjacent): a new family."""
+    rng = np.random.default_rng(0)
+    ids = ["a", "a", "a", "b", "c", "c", "a"]
+    df = pd.DataFrame(rng.integers(1, 6, (len(ids), len(Q.questions))), columns=answer_columns(Q))
+    df.insert(0, "family_id", ids)
+    path = tmp_path / "families.csv"
+    df.to_csv(path, index=False)
+    return path, df
+
+def test_iter_families_joins_runs_across_chunks(families):
+    path, df = families
+    answers = df[answer_columns(Q)].to_numpy()
+    expected = [("a", answers[0:3]), ("b", answers[3:4]), ("c", answers[4:6]), ("a", answers[6:7])]
+    for chunksize in (2, 3, 100):         # with 2, family a straddles the first chunk boundary
+        got = list(iter_families(path, Q, chunksize=chunksize))
+        assert [fid for fid, _ in got] == [fid for fid, _ in expected]
+        for (_, m), (_, e) in zip(got, expected):
+            assert np.array_equal(m, e)
+
+def test_cohort_totals():
+    totals = CohortTotals(Q)
+    n = len(Q.questions)
+    totals.add(np.array([[5] * n, [1] * n]))      # family mean 3: mid tier on every facet
+    totals.add(np.array([[4] * n]))               # family mean 4: strength
+    assert (totals.families, totals.respondents) == (2, 3)
+    (_, respondents), (_, families) = totals.tables()
+    assert np.allclose(respondents["平均(1-5)"], round(10 / 3, 2))
+    assert respondents["P25"].tolist() == [1.0] * 4
+    assert respondents["中位數"].tolist() == [4.0] * 4
+    assert respondents["P75"].tolist() == [5.0] * 4
+    assert families["優勢(家族數)"].tolist() == [1] * 4
+    assert families["可優化(家族數)"].tolist() == [1] * 4
+    assert families["優先改善(家族數)"].tolist() == [0] * 4
+
+def test_table_pages_long_tables(tmp_path):
+    w = ReportWriter(tmp_path / "t.pdf")
+    drawn, begin = [], w.c.beginText
+    def spy(*args, **kwargs):
+        t = begin(*args, **kwargs)
+        lines = t.textLines
+        t.textLines = lambda stuff, *rest: (drawn.append(list(stuff)), lines(stuff, *rest))[1]
+        return t
+    w.c.beginText = spy
+    w.new_page()
+    rows = [str(i) for i in range(300)]
+    w.table("long", {"row": rows, "value": [f"v{i}" for i in rows]})
+    per_page = int((w.top - w.bottom) // 14) - 1
+    assert -(-300 // per_page) <= w.c.getPageNumber() <= -(-300 // per_page) + 1    # the title takes part of page one
+    pages = drawn[0::2]                            # the "row" column on each page
+    assert all(p[0] == "row" and len(p) - 1 <= per_page for p in pages)
+    assert sum((p[1:] for p in pages), []) == rows
+    assert sum((p[1:] for p in drawn[1::2]), []) == [f"v{i}" for i in rows]
+    assert w.y >= w.bottom - 14
+    w.close()
+    assert _pages((tmp_path / "t.pdf").read_bytes()) == w.c.getPageNumber() - 1
+
+def test_report_stopped_early_still_writes_a_pdf(families, tmp_path):
+    path, _ = families
+    full, partial = tmp_path / "full.pdf", tmp_path / "partial.pdf"
+    assert [fid for fid, _ in cohort_report(path, Q, full)] == ["a", "b", "c", "a"]
+    sections = cohort_report(path, Q, partial)
+    assert next(sections) == ("a", 3)
+    assert not partial.exists() or partial.stat().st_size == 0
+    sections.close()                               # e.g. the advisor cancelled the job
+    data = partial.read_bytes()
+    assert data.startswith(b"%PDF") and data.rstrip().endswith(b"%%EOF")
+    assert 2 <= _pages(data) < _pages(full.read_bytes())     # cover + family a only
@@ -0,0 +1,156 @@
+import json, os, subprocess, sys, time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+import pytest
+from utils import jobs
+from utils.jobs import JobQueue, job_id, read_state
+
+DATA = b"family_id," + ",".join(f"Q{i}" for i in range(1, 13)).encode() + b"\n"
+
+class HeldPool:
+    """Stands in for the process pool: records submissions, futures stay pending."""
+    def __init__(self):
+        self.submitted = []
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+        return Future()
+    def shutdown(self, **kw):
+        pass
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(tmp_path / "jobs")
+    q._pool = HeldPool()
+    return q
+
+def _edit_state(q, jid, **changes):
+    state = read_state(q.root / jid)
+    state.update(changes)
+    (q.root / jid / "state.json").write_text(json.dumps(state), encoding="utf-8")
+    return state
+
+def _dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+def test_job_id_covers_questionnaire_column_and_content():
+    ids = {job_id("family_impact", DATA), job_id("legacy_readiness", DATA),
+           job_id("family_impact", DATA, "household"), job_id("family_impact", DATA + b"\n")}
+    assert len(ids) == 4 and job_id("family_impact", DATA) == job_id("family_impact", DATA, "family_id")
+
+def test_path_rejects_malformed_ids(queue):
+    assert queue.path("../" * 8) is None and queue.path("g" * jobs.JOB_ID_LENGTH) is None
+    assert queue.state("0" * jobs.JOB_ID_LENGTH) is None
+
+def test_same_file_is_deduplicated(queue):
+    jid, created = queue.submit("family_impact", "a.csv", DATA)
+    assert created and read_state(queue.root / jid)["status"] == "queued"
+    assert queue.submit("family_impact", "again.csv", DATA) == (jid, False)
+    other, created = queue.submit("family_impact", "a.csv", DATA, "household")
+    assert other != jid and created
+    assert len(queue._pool.submitted) == 2
+    assert [s["id"] for s in queue.recent()] == [other, jid]
+
+def test_done_job_is_not_rerun_failed_job_is(queue):
+    jid, _ = queue.submit("family_impact", "a.csv", DATA)
+    queue._futures.clear()
+    _edit_state(queue, jid, status="done")
+    assert queue.submit("family_impact", "a.csv", DATA) == (jid, False) and len(queue._pool.submitted) == 1
+    _edit_state(queue, jid, status="failed", error="boom")
+    assert queue.submit("family_impact", "a.csv", DATA) == (jid, False) and len(queue._pool.submitted) == 2
+    assert read_state(queue.root / jid)["status"] == "queued"
+
+def test_waiting_in_line_is_not_stale(queue):
+    jid, _ = queue.submit("family_impact", "a.csv", DATA)
+    state = _edit_state(queue, jid, updated_at=time.time() - 10 * jobs.STALE_AFTER)
+    assert not queue.stale(state)
+    state = _edit_state(queue, jid, owner=[state["owner"][0], 1])     # queued by another, live server process
+    other = JobQueue(queue.root)
+    other._pool = HeldPool()
+    assert not other.stale(state)
+    assert other.submit("family_impact", "a.csv", DATA) == (jid, False) and not other._pool.submitted
+
+def test_lost_jobs_are_stale(queue):
+    jid, _ = queue.submit("family_impact", "a.csv", DATA)
+    state = read_state(queue.root / jid)
+    old = time.time() - 2 * jobs.STALE_AFTER
+    assert queue.stale(dict(state, status="running", updated_at=old))
+    assert not queue.stale(dict(state, status="running", updated_at=time.time()))
+    assert queue.stale(dict(state, owner=[state["owner"][0], _dead_pid()]))
+    assert not queue.stale(dict(state, owner=["some-other-host", _dead_pid()]))
+    queue._futures[jid].cancel()
+    assert queue.stale(state)                        # this process's pool dropped it
+    assert not queue.stale(dict(state, status="done", updated_at=old))
+
+def test_restarted_server_reruns_its_queued_jobs(queue):
+    jid, _ = queue.submit("family_impact", "a.csv", DATA)
+    _edit_state(queue, jid, owner=[read_state(queue.root / jid)["owner"][0], _dead_pid()])
+    restarted = JobQueue(queue.root)
+    restarted._pool = HeldPool()
+    assert restarted.submit("family_impact", "a.csv", DATA) == (jid, False)
+    assert len(restarted._pool.submitted) == 1
+
+class BrokenPool(HeldPool):
+    """A pool whose workers died: every submit raises `error`."""
+    def __init__(self, error):
+        super().__init__()
+        self.error, self.shut = error, False
+    def submit(self, fn, *args):
+        raise self.error
+    def shutdown(self, **kw):
+        self.shut = True
+
+def test_broken_pool_is_replaced(queue, monkeypatch):
+    broken = queue._pool = BrokenPool(BrokenProcessPool("a worker died"))
+    fresh = HeldPool()
+    monkeypatch.setattr(jobs, "spawn_pool", lambda workers: fresh)
+    jid, created = queue.submit("family_impact", "a.csv", DATA)
+    assert created and broken.shut and queue._pool is fresh
+    assert len(fresh.submitted) == 1 and read_state(queue.root / jid)["status"] == "queued"
+
+def test_failed_submit_marks_the_job_failed(queue):
+    queue._pool = BrokenPool(RuntimeError("cannot schedule new futures after shutdown"))
+    jid, _ = queue.submit("family_impact", "a.csv", DATA)
+    state = read_state(queue.root / jid)
+    assert state["status"] == "failed" and "RuntimeError" in state["error"]
+    queue._pool = HeldPool()
+    assert queue.submit("family_impact", "a.csv", DATA) == (jid, False)     # failed: run again
+    assert read_state(queue.root / jid)["status"] == "queued"
+
+def _families():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.integers(1, 6, (7, 12)), columns=[f"Q{i}" for i in range(1, 13)])
+    df.insert(0, "family_id", ["A", "A", "B", "C", "C", "C", "D"])
+    return df.to_csv(index=False).encode("utf-8")
+
+def _wait(q, jid, timeout=120):
+    deadline = time.time() + timeout
+    while q.state(jid)["status"] in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.2)
+    return q.state(jid)
+
+def test_job_after_a_worker_died(tmp_path):
+    q = JobQueue(tmp_path / "jobs", workers=1)
+    try:
+        with pytest.raises(BrokenProcessPool):
+            q._get_pool().submit(os._exit, 1).result(timeout=120)
+        jid, _ = q.submit("family_impact", "families.csv", _families())
+        state = _wait(q, jid)
+        assert state["status"] == "done", state.get("error")
+    finally:
+        q.close()
+
+def test_job_runs_to_completion(tmp_path):
+    q = JobQueue(tmp_path / "jobs", workers=1)
+    try:
+        jid, created = q.submit("family_impact", "families.csv", _families())
+        state = _wait(q, jid)
+        assert state["status"] == "done", state.get("error")
+        assert (state["done"], state["families"]) == (7, 4)
+        assert len(pd.read_csv(q.output(jid, "scores"), encoding="utf-8-sig")) == 7
+        assert q.output(jid, "report").read_bytes().startswith(b"%PDF")
+    finally:
+        q.close()
@@ -0,0 +1,64 @@
+import re
+import pytest
+from utils import metrics as metrics_mod
+from utils.metrics import BUCKETS, Metrics
+
+def _samples(text):
+    """{metric{labels}: value} for every sample line of an exposition text."""
+    return {k: float(v) for k, v in (line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))}
+
+def test_histogram_buckets_sum_and_count():
+    m = Metrics()
+    for s in (0.0004, 0.001, 0.003, 0.005, 0.2, 0.2, 7.0, 30.0):      # 0.001 and 0.005 sit on bucket bounds
+        m.observe("scoring", s)
+    m.observe("pdf", 0.02, ok=False)
+    text = m.prometheus_text()
+    samples = _samples(text)
+
+    cumulative = {"0.001": 2, "0.0025": 2, "0.005": 4, "0.01": 4, "0.025": 4, "0.05": 4, "0.1": 4,
+                  "0.25": 6, "0.5": 6, "1.0": 6, "2.5": 6, "5.0": 6, "10.0": 7, "+Inf": 8}
+    assert list(cumulative) == [*map(repr, BUCKETS), "+Inf"]
+    for le, n in cumulative.items():
+        assert samples[f'impact_stage_seconds_bucket{{stage="scoring",le="{le}"}}'] == n
+    assert samples['impact_stage_seconds_count{stage="scoring"}'] == 8
+    assert samples['impact_stage_seconds_sum{stage="scoring"}'] == pytest.approx(37.4094, abs=1e-6)
+    assert samples['impact_stage_errors_total{stage="scoring"}'] == 0
+    assert samples['impact_stage_errors_total{stage="pdf"}'] == 1
+    assert samples['impact_stage_seconds_bucket{stage="pdf",le="0.025"}'] == 1
+
+def test_exposition_format():
+    m = Metrics()
+    m.observe("b_stage", 0.01)
+    m.observe("a_stage", 0.01)
+    m.incr("render_cache_hit", 3)
+    text = m.prometheus_text()
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert lines[:2] == ["# HELP impact_stage_seconds Latency of one submit/report stage.",
+                         "# TYPE impact_stage_seconds histogram"]
+    sample = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? -?[0-9.]+(e-?[0-9]+)?$')
+    assert all(line.startswith("# ") or sample.match(line) for line in lines), text
+    stages = [re.search(r'stage="(\w+)"', l).group(1) for l in lines if l.startswith("impact_stage_seconds_count")]
+    assert stages == ["a_stage", "b_stage"]
+    assert lines[-2:] == ["# TYPE impact_render_cache_hit_total counter", "impact_render_cache_hit_total 3"]
+
+def test_timed_records_failures_and_recent_samples():
+    m = Metrics(recent=2)
+    with m.timed("ok"):
+        pass
+    with pytest.raises(ValueError):
+        with m.timed("boom"):
+            raise ValueError
+    m.observe("third", 0.5)
+    recent = m.snapshot()
+    assert [(stage, ok) for _, stage, _, ok in recent] == [("third", True), ("boom", False)]
+    assert m.errors == {"ok": 0, "boom": 1, "third": 0}
+
+def test_write_textfile(tmp_path, monkeypatch):
+    m = Metrics()
+    m.observe("scoring", 0.01)
+    monkeypatch.setattr(metrics_mod, "metrics", m)
+    path = tmp_path / "impact.prom"
+    metrics_mod.write_textfile(path)
+    assert path.read_text(encoding="utf-8") == m.prometheus_text()
+    assert list(tmp_path.iterdir()) == [path]
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from utils import outcome_table as ot
+from utils.questionnaires import FAMILY_IMPACT, LEGACY_READINESS
+from utils.advice import RULE_SETS, advice_texts, evaluate
+from utils import scoring
+from utils.pipeline import score_chunk
+from utils.service import score_batch
+from utils.scoring import compute_family_impact_scores, compute_legacy_readiness, interpret_scores, score_matrix, summarize_matrix, sums_outcome
+
+QS = [FAMILY_IMPACT, LEGACY_READINESS]
+
+@pytest.fixture(scope="module")
+def tables():
+    return {q.key: ot.build_table(q) for q in QS}
+
+@pytest.mark.parametrize("q", QS, ids=lambda q: q.key)
+def test_save_load_round_trip(q, tables, tmp_path):
+    table = tables[q.key]
+    path = ot.save_table(table, tmp_path)
+    assert ot.save_table(table, tmp_path) == path          # already there: not rebuilt
+    loaded = ot.load_table(q, tmp_path)
+    for name in ot.ARRAYS:
+        assert isinstance(getattr(loaded, name), np.memmap)
+        assert np.array_equal(getattr(loaded, name), getattr(table, name))
+    assert loaded.summaries == table.summaries and loaded.advice == table.advice
+    assert ot.load_table(q, tmp_path / "elsewhere") is None
+
+@pytest.mark.parametrize("q", QS, ids=lambda q: q.key)
+def test_lookups_match_direct_scoring(q, tables):
+    answers = np.random.default_rng(0).integers(1, 6, (2000, len(q.questions)))
+    batch = score_matrix(q, answers)
+    table = tables[q.key]
+    rows = table.index(batch["sum"])
+    rules = RULE_SETS[q.key]
+    assert table.summary(batch["sum"]) == summarize_matrix(q, batch)
+    assert table.advice_for(batch["sum"]) == advice_texts(rules, evaluate(rules, batch[rules.metric]))
+    assert np.array_equal(np.asarray(table.risk)[rows], batch["risk"])
+
+def test_index_outside_the_table_is_none(tables):
+    table = tables[FAMILY_IMPACT.key]
+    assert table.index([[3, 3, 3, 2]]) is None             # below the facet's 3 * 1
+    assert table.index([[15, 15, 15, 16]]) is None
+    assert table.summary([[15, 15, 15, 16]]) is None and table.advice_for([[2, 3, 3, 3]]) is None
+    assert table.index([[3, 3, 3, 3], [15, 15, 15, 15]]).tolist() == [0, len(table.summary_id) - 1]
+
+def test_compute_functions_same_with_and_without_table(tables, tmp_path, monkeypatch):
+    rng = np.random.default_rng(1)
+    cases = [(rng.integers(lo, hi, len(FAMILY_IMPACT.questions)).tolist(), rng.integers(lo, hi, len(LEGACY_READINESS.questions)).tolist())
+             for lo, hi in ((1, 6), (0, 8)) for _ in range(100)]       # (0, 8): answers outside 1-5 fall back
+    def run():
+        out = []
+        for a, b in cases:
+            scores, summary = compute_family_impact_scores(FAMILY_IMPACT, a)
+            out.append((scores, summary, interpret_scores(scores), compute_legacy_readiness(LEGACY_READINESS, b)))
+        return out
+    plain = run()
+    for q in QS:
+        ot.save_table(tables[q.key], tmp_path)
+    monkeypatch.setattr(ot, "_tables", {})
+    monkeypatch.setenv("IMPACT_OUTCOME_TABLE_DIR", str(tmp_path))
+    assert ot.outcome_table(FAMILY_IMPACT) is not None
+    assert run() == plain
+
+def test_bulk_paths_same_with_and_without_table(tables, tmp_path, monkeypatch):
+    rng = np.random.default_rng(2)
+    answers = {q.key: rng.integers(1, 6, (500, len(q.questions))) for q in QS}
+    ids = np.array([f"r{i}" for i in range(500)])
+    def run():
+        out = []
+        for q in QS:
+            m = answers[q.key]
+            out.append((score_chunk(q, ids, m)[0], score_batch(q, ids.tolist(), m),
+                        [sums_outcome(q, s) for s in score_matrix(q, m[:50])["sum"]]))
+        return out
+    plain = run()
+    for q in QS:
+        ot.save_table(tables[q.key], tmp_path)
+    monkeypatch.setattr(ot, "_tables", {})
+    monkeypatch.setenv("IMPACT_OUTCOME_TABLE_DIR", str(tmp_path))
+    def unused(*args):
+        raise AssertionError("scored directly although the outcome table is enabled")
+    monkeypatch.setattr(scoring, "summarize_matrix", unused)
+    monkeypatch.setattr(scoring, "advice_texts", unused)
+    for (wide, results, single), (wide0, results0, single0) in zip(run(), plain):
+        assert wide.equals(wide0) and results == results0 and single == single0
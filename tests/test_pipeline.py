@@ -0,0 +1,94 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from utils.pipeline import ChunkWriter, answer_columns, iter_response_chunks, read_responses, run_pipeline, score_chunk
+from utils.questionnaires import FAMILY_IMPACT
+from utils.scoring import score_matrix
+
+@pytest.fixture
+def responses():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.integers(1, 6, (23, len(FAMILY_IMPACT.questions))), columns=answer_columns(FAMILY_IMPACT))
+    df.insert(0, "respondent_id", [f"r{i:02d}" for i in range(len(df))])
+    df["note"] = "ignored"
+    return df
+
+def _write(df, path):
+    if path.suffix == ".csv":
+        df.to_csv(path, index=False)
+    elif path.suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+        df.to_parquet(path, index=False)
+    else:
+        pytest.importorskip("openpyxl")
+        df.to_excel(path, index=False, engine="openpyxl")     # pandas reads an .xls name by content
+    return path
+
+@pytest.mark.parametrize("suffix", [".csv", ".xlsx", ".parquet", ".xls"])
+def test_chunks_carry_ids_and_answers(responses, tmp_path, suffix):
+    path = _write(responses, tmp_path / f"in{suffix}")
+    chunks = list(iter_response_chunks(path, FAMILY_IMPACT, chunksize=10))
+    assert [len(ids) for ids, _ in chunks] == [10, 10, 3]
+    ids = np.concatenate([c[0] for c in chunks])
+    answers = np.concatenate([c[1] for c in chunks])
+    assert ids.tolist() == responses["respondent_id"].tolist()
+    assert answers.dtype == np.int64
+    assert np.array_equal(answers, responses[answer_columns(FAMILY_IMPACT)].to_numpy())
+
+def test_file_object_and_generated_ids(responses):
+    buf = io.BytesIO(responses.drop(columns="respondent_id").to_csv(index=False).encode("utf-8"))
+    buf.name = "upload.csv"
+    ids, answers = read_responses(buf, FAMILY_IMPACT)
+    assert ids.tolist() == [str(i) for i in range(1, len(responses) + 1)]
+    assert answers.shape == (len(responses), len(FAMILY_IMPACT.questions))
+
+def test_bad_inputs(responses, tmp_path):
+    with pytest.raises(ValueError, match="unsupported"):
+        list(iter_response_chunks(tmp_path / "x.txt", FAMILY_IMPACT))
+    path = _write(responses.drop(columns="Q7"), tmp_path / "missing.csv")
+    with pytest.raises(ValueError, match="Q7"):
+        list(iter_response_chunks(path, FAMILY_IMPACT))
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_chunk_writer_appends(tmp_path, suffix):
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"out{suffix}"
+    parts = [pd.DataFrame({"id": ["a", "b"], "v": [1, 2]}), pd.DataFrame({"id": ["c"], "v": [3]})]
+    with ChunkWriter(path) as w:
+        for df in parts:
+            w.write(df)
+    back = pd.read_csv(path, encoding="utf-8-sig") if suffix == ".csv" else pd.read_parquet(path)
+    assert back["id"].tolist() == ["a", "b", "c"] and back["v"].tolist() == [1, 2, 3]
+    if suffix == ".csv":
+        assert path.read_bytes().startswith(b"\xef\xbb\xbfid,v")
+        assert path.read_text(encoding="utf-8-sig").count("id,v") == 1
+
+def test_run_pipeline_matches_score_matrix(responses, tmp_path):
+    src = _write(responses, tmp_path / "in.csv")
+    n = run_pipeline(src, "family_impact", tmp_path / "wide.csv", tmp_path / "long.csv", chunksize=7)
+    assert n == len(responses)
+    wide = pd.read_csv(tmp_path / "wide.csv", encoding="utf-8-sig")
+    long = pd.read_csv(tmp_path / "long.csv", encoding="utf-8-sig")
+    batch = score_matrix(FAMILY_IMPACT, responses[answer_columns(FAMILY_IMPACT)])
+    assert np.array_equal(wide[[f"{f}_sum" for f in batch["facets"]]].to_numpy(), batch["sum"])
+    assert len(long) == len(responses) * len(batch["facets"])
+    expected, _ = score_chunk(FAMILY_IMPACT, responses["respondent_id"].to_numpy(), responses[answer_columns(FAMILY_IMPACT)].to_numpy())
+    assert wide["summary"].tolist() == expected["summary"].tolist()
+    assert wide["advice"].tolist() == expected["advice"].tolist()
+
+@pytest.mark.parametrize("cell, shown", [("", "a blank cell"), ("9", "9"), ("0", "0"), ("2.5", "2.5"), ("x", "'x'")])
+def test_invalid_answers_are_rejected(responses, cell, shown):
+    text = responses.to_csv(index=False).splitlines()
+    row = text[3].split(",")
+    row[5] = cell                       # Q5 of data row 3
+    buf = io.BytesIO("\n".join(text[:3] + [",".join(row)] + text[4:]).encode("utf-8"))
+    buf.name = "upload.csv"
+    with pytest.raises(ValueError, match=rf"row 3, column Q5: .* \(got {shown}\)"):
+        read_responses(buf, FAMILY_IMPACT)
+
+def test_whole_number_floats_are_accepted(responses):
+    buf = io.BytesIO(responses.astype({"Q1": float}).to_csv(index=False).encode("utf-8"))
+    buf.name = "upload.csv"
+    assert np.array_equal(read_responses(buf, FAMILY_IMPACT)[1][:, 0], responses["Q1"].to_numpy())
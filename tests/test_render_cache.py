@@ -0,0 +1,47 @@
+import threading
+from utils.render_cache import RenderCache
+
+def test_key_depends_on_inputs_only():
+    k = RenderCache.key("radar", ["a", "b"], [1, 2.5], dpi=200)
+    assert k == RenderCache.key("radar", ("a", "b"), [1.0, 2.5], dpi=200)
+    assert len({k, RenderCache.key("radar", ["a", "b"], [1, 2.6], dpi=200), RenderCache.key("radar", ["a", "b"], [1, 2.5], dpi=100),
+                RenderCache.key("heatmap", ["a", "b"], [1, 2.5], dpi=200)}) == 4
+
+def test_lru_eviction_order_and_entry_cap():
+    cache = RenderCache(max_entries=3)
+    for k in "abc":
+        cache.put(k, k.encode())
+    assert cache.get("a") == b"a"                     # a is now the most recent
+    cache.put("d", b"d")                              # evicts b, the least recently used
+    assert list(cache._mem) == ["c", "a", "d"]
+    assert cache.get("b") is None
+    cache.put("c", b"c2")                             # overwriting refreshes without growing
+    cache.put("e", b"e")
+    assert list(cache._mem) == ["d", "c", "e"] and cache.get("c") == b"c2"
+
+def test_disk_tier_round_trip(tmp_path):
+    writer = RenderCache(max_entries=2, disk_dir=tmp_path)
+    key = RenderCache.key("radar", ["a"], [3])
+    writer.put(key, b"\x89PNG bytes")
+    assert (tmp_path / key[:2] / f"{key}.bin").read_bytes() == b"\x89PNG bytes"
+    assert not list(tmp_path.rglob("*.tmp"))
+    reader = RenderCache(max_entries=2, disk_dir=tmp_path)      # another process on the host
+    assert reader.get(key) == b"\x89PNG bytes" and key in reader._mem
+    for k in "xyz":                                              # evicted from memory, still on disk
+        reader.put(k * 64, b"-")
+    assert key not in reader._mem and reader.get(key) == b"\x89PNG bytes"
+    assert RenderCache(disk_dir=tmp_path).get("0" * 64) is None
+
+def test_get_or_render_counts_under_concurrency():
+    cache = RenderCache(max_entries=8)
+    renders = []
+    def work():
+        for i in range(500):
+            cache.get_or_render(f"k{i % 4}", lambda: renders.append(1) or b"x")
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.hits + cache.misses == 8 * 500
+    assert cache.misses == len(renders) >= 4
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.questionnaires import FAMILY_IMPACT, LEGACY_READINESS
+from utils.scoring import FacetTally, aggregate_members, score_matrix, compute_family_impact_scores, compute_legacy_readiness
+
+def per_answer(questions, answers):
+    """The original one-respondent loop (before score_matrix)."""
+    facets = {}
+    for (facet, _), score in zip(questions, answers):
+        bucket = facets.setdefault(facet, {"sum": 0, "cnt": 0})
+        bucket["sum"] += int(score)
+        bucket["cnt"] += 1
+    for v in facets.values():
+        v["avg"] = v["sum"] / max(1, v["cnt"])
+    return facets
+
+@pytest.mark.parametrize("q", [FAMILY_IMPACT, LEGACY_READINESS], ids=lambda q: q.key)
+def test_score_matrix_matches_per_answer_loop(q):
+    answers = np.random.default_rng(0).integers(1, 6, (200, len(q.questions)))
+    batch = score_matrix(q.questions, answers)
+    for i, row in enumerate(answers):
+        ref = per_answer(q.questions, row)
+        assert batch["facets"] == list(ref)
+        assert batch["sum"][i].tolist() == [v["sum"] for v in ref.values()]
+        assert batch["cnt"][i].tolist() == [v["cnt"] for v in ref.values()]
+        assert batch["avg"][i].tolist() == [v["avg"] for v in ref.values()]
+        assert batch["risk"][i].tolist() == [round(5 - v["avg"], 2) for v in ref.values()]
+
+def test_compute_functions_match_per_answer_loop():
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        a = rng.integers(1, 6, len(FAMILY_IMPACT.questions)).tolist()
+        assert compute_family_impact_scores(FAMILY_IMPACT.questions, a)[0] == per_answer(FAMILY_IMPACT.questions, a)
+        b = rng.integers(1, 6, len(LEGACY_READINESS.questions)).tolist()
+        domains, risk, _, _ = compute_legacy_readiness(LEGACY_READINESS.questions, b)
+        ref = per_answer(LEGACY_READINESS.questions, b)
+        assert domains == ref
+        assert risk == {d: round(5 - v["avg"], 2) for d, v in ref.items()}
+
+def test_score_matrix_input_shapes():
+    q = FAMILY_IMPACT
+    row = [3, 4, 5, 2, 1, 3, 4, 5, 2, 3, 4, 5]
+    one = score_matrix(q, row)
+    assert one["sum"].shape == (1, len(q.facets))
+    df = pd.DataFrame([row, row], columns=[f"Q{i}" for i in range(1, 13)])
+    assert (score_matrix(q, df)["sum"] == one["sum"]).all()
+    partial = score_matrix(q.questions, row[:5])      # unanswered questions are left out
+    assert partial["sum"].tolist() == [[v["sum"] for v in per_answer(q.questions, row[:5]).values()]]
+
+def test_facet_tally_updates_only_the_changed_facet():
+    q = LEGACY_READINESS
+    tally = FacetTally(q)
+    assert tally.answers == [3] * len(q.questions) and tally.version == 0
+    assert tally.sums == [3 * c for c in q.facet_counts.tolist()]
+    before = list(tally.sums)
+    j = int(q.facet_index[5])
+    assert tally.update(5, 5)
+    assert tally.version == 1
+    assert [s - b for s, b in zip(tally.sums, before)] == [2 if k == j else 0 for k in range(len(before))]
+    assert not tally.update(5, 5) and not tally.update(5, "5")    # same answer: no change, no new version
+    assert tally.version == 1
+
+def test_facet_tally_tracks_score_matrix():
+    q = FAMILY_IMPACT
+    tally = FacetTally(q)
+    rng = np.random.default_rng(2)
+    for _ in range(300):
+        tally.update(int(rng.integers(len(q.questions))), int(rng.integers(1, 6)))
+        batch = score_matrix(q, tally.answers)
+        assert tally.sums == batch["sum"][0].tolist()
+    assert tally.scores() == per_answer(q.questions, tally.answers)
+
+def test_aggregate_members_matches_per_member_scoring():
+    q = FAMILY_IMPACT
+    members = np.random.default_rng(3).integers(1, 6, (5, len(q.questions)))
+    agg = aggregate_members(q, members)
+    avgs = np.array([[v["avg"] for v in per_answer(q.questions, m).values()] for m in members])
+    assert agg["facets"] == list(q.facets)
+    assert np.allclose(agg["member_avg"], avgs)
+    assert np.allclose(agg["mean"], avgs.mean(axis=0)) and np.allclose(agg["std"], avgs.std(axis=0))
+    assert np.allclose(agg["min"], avgs.min(axis=0)) and np.allclose(agg["max"], avgs.max(axis=0))
+    assert np.allclose(agg["alignment"], 1 - avgs.std(axis=0) / 2)
+    assert agg["overall_alignment"] == pytest.approx(float((1 - avgs.std(axis=0) / 2).mean()))
+    same = aggregate_members(q, np.repeat(members[:1], 3, axis=0))
+    assert np.allclose(same["alignment"], 1.0) and same["overall_alignment"] == 1.0
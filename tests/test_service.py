@@ -0,0 +1,94 @@
+import asyncio, base64, json
+import numpy as np
+import pytest
+from utils import service
+from utils.questionnaires import FAMILY_IMPACT, LEGACY_READINESS
+from utils.scoring import compute_family_impact_scores, compute_legacy_readiness, interpret_scores
+
+def call(method, path, body=b"", chunk=None):
+    """Run one request through the ASGI app; returns (status, headers, body)."""
+    data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    parts = [data[i:i + chunk] for i in range(0, len(data), chunk)] if chunk else [data]
+    messages = [{"type": "http.request", "body": p, "more_body": i < len(parts) - 1} for i, p in enumerate(parts)]
+    sent = []
+    async def receive():
+        return messages.pop(0)
+    async def send(message):
+        sent.append(message)
+    asyncio.run(service.app({"type": "http", "method": method, "path": path}, receive, send))
+    return sent[0]["status"], dict(sent[0]["headers"]), sent[1]["body"]
+
+def call_json(method, path, body=b""):
+    status, headers, payload = call(method, path, body)
+    assert headers[b"content-type"] == b"application/json"
+    assert int(headers[b"content-length"]) == len(payload)
+    return status, json.loads(payload)
+
+def test_health_and_questionnaires():
+    assert call_json("GET", "/health") == (200, {"status": "ok"})
+    status, data = call_json("GET", "/v1/questionnaires")
+    assert status == 200
+    assert {d["key"] for d in data} == {FAMILY_IMPACT.key, LEGACY_READINESS.key}
+    fi = next(d for d in data if d["key"] == FAMILY_IMPACT.key)
+    assert len(fi["questions"]) == len(FAMILY_IMPACT.questions) and fi["facets"] == list(FAMILY_IMPACT.facets)
+
+def test_score_matches_page_scoring():
+    answers = np.random.default_rng(0).integers(1, 6, len(FAMILY_IMPACT.questions)).tolist()
+    status, result = call_json("POST", "/v1/family_impact/score", {"id": "c-1", "answers": answers})
+    scores, summary = compute_family_impact_scores(FAMILY_IMPACT, answers)
+    assert status == 200 and result["id"] == "c-1"
+    assert [(f["facet"], f["sum"]) for f in result["facets"]] == [(k, v["sum"]) for k, v in scores.items()]
+    assert result["summary"] == summary and result["advice"] == interpret_scores(scores)
+
+def test_batch_matches_one_by_one():
+    rng = np.random.default_rng(1)
+    rows = rng.integers(1, 6, (40, len(LEGACY_READINESS.questions))).tolist()
+    body = {"responses": [{"id": f"r{i}", "answers": a} for i, a in enumerate(rows)]}
+    status, data = call_json("POST", "/v1/legacy_readiness/batch", body)
+    assert status == 200 and data["count"] == len(rows)
+    for result, answers in zip(data["results"], rows):
+        _, risk, summary, actions = compute_legacy_readiness(LEGACY_READINESS, answers)
+        assert {f["facet"]: f["risk"] for f in result["facets"]} == risk
+        assert (result["summary"], result["advice"]) == (summary, actions)
+    assert call_json("POST", "/v1/legacy_readiness/batch", {"responses": []}) == (200, {"questionnaire": "legacy_readiness", "count": 0, "results": []})
+
+@pytest.mark.parametrize("method, path, body, status", [
+    ("GET", "/nope", b"", 404),
+    ("POST", "/v1/unknown/score", {"answers": [3]}, 404),
+    ("GET", "/v1/family_impact/score", b"", 405),
+    ("POST", "/v1/questionnaires", b"", 405),
+    ("POST", "/v1/family_impact/score", b"{not json", 400),
+    ("POST", "/v1/family_impact/score", [1, 2], 400),
+    ("POST", "/v1/family_impact/score", {"answers": [3] * 11}, 422),
+    ("POST", "/v1/family_impact/score", {"answers": [3] * 11 + [6]}, 422),
+    ("POST", "/v1/family_impact/score", {"answers": [3] * 11 + [2.5]}, 422),
+    ("POST", "/v1/family_impact/score", {"answers": [3] * 12, "render": ["gif"]}, 422),
+    ("POST", "/v1/family_impact/batch", {"responses": [{"answers": [3] * 12}, {"answers": [3] * 5}]}, 422),
+    ("POST", "/v1/family_impact/batch", {"responses": "x"}, 422),
+])
+def test_errors(method, path, body, status):
+    got, data = call_json(method, path, body)
+    assert got == status and data["error"]
+
+def test_limits(monkeypatch):
+    monkeypatch.setattr(service, "MAX_BATCH", 2)
+    assert call_json("POST", "/v1/family_impact/batch", {"responses": [{"answers": [3] * 12}] * 3})[0] == 413
+    monkeypatch.setattr(service, "MAX_BODY", 100)
+    assert call_json("POST", "/v1/family_impact/score", {"answers": [3] * 12, "pad": "x" * 200}, )[0] == 413
+    status, _, _ = call("POST", "/v1/family_impact/score", json.dumps({"answers": [3] * 12}).encode(), chunk=7)
+    assert status == 200                 # a body split across several messages is reassembled
+
+@pytest.fixture
+def render_pool(monkeypatch):
+    monkeypatch.setenv("IMPACT_SERVICE_WORKERS", "1")
+    yield
+    if service._pool is not None:
+        service._pool.shutdown(cancel_futures=True)
+        service._pool = None
+
+def test_rendered_outputs(render_pool):
+    answers = [4] * len(FAMILY_IMPACT.questions)
+    status, headers, pdf = call("POST", "/v1/family_impact/report", {"answers": answers})
+    assert status == 200 and headers[b"content-type"] == b"application/pdf" and pdf.startswith(b"%PDF")
+    status, result = call_json("POST", "/v1/family_impact/score", {"answers": answers, "render": "png"})
+    assert status == 200 and base64.b64decode(result["png"]).startswith(b"\x89PNG")
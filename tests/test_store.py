@@ -0,0 +1,77 @@
+import sqlite3, threading
+import pytest
+from utils import store as store_mod
+from utils.store import ResponseStore
+
+@pytest.fixture
+def store(tmp_path):
+    s = ResponseStore(tmp_path / "responses.db", flush_interval=0.05)
+    yield s
+    s.close()
+
+def test_submit_flush_history(store):
+    t0 = 1_700_000_000.0
+    for i in range(5):
+        store.submit("family_impact", [i % 5 + 1] * 12, [3 + i] * 4, family_id="fam", session_id="s1", created_at=t0 + i)
+    store.submit("family_impact", [1] * 12, [3] * 4, session_id="s2", created_at=t0 + 10)
+    store.submit("legacy_readiness", [2] * 16, [8] * 4, family_id="fam", created_at=t0 + 20)
+    assert store.flush()
+
+    past = store.history("family_impact", family_id="fam", limit=3)
+    assert [p["created_at"] for p in past] == [t0 + 4, t0 + 3, t0 + 2]
+    assert past[0]["answers"].tolist() == [5] * 12 and past[0]["facet_sums"].tolist() == [7] * 4
+    assert [p["created_at"] for p in store.history("family_impact", family_id="fam", before=t0 + 2)] == [t0 + 1, t0]
+    assert len(store.history("family_impact", session_id="s2")) == 1
+    assert len(store.history("family_impact", family_id="fam", session_id="s2")) == 5    # family id wins
+    assert store.history("family_impact") == []
+    assert len(store.history("legacy_readiness", family_id="fam")) == 1
+
+def test_failed_batch_is_retried_not_reported_as_flushed(tmp_path, monkeypatch):
+    class Flaky:
+        """A connection whose inserts fail `failures` times (e.g. database is locked)."""
+        def __init__(self, conn, failures):
+            self.conn, self.failures = conn, failures
+        def __enter__(self):
+            return self.conn.__enter__()
+        def __exit__(self, *exc):
+            return self.conn.__exit__(*exc)
+        def executemany(self, *args):
+            if self.failures:
+                self.failures -= 1
+                raise sqlite3.OperationalError("database is locked")
+            return self.conn.executemany(*args)
+        def close(self):
+            self.conn.close()
+
+    connect = store_mod._connect
+    monkeypatch.setattr(store_mod, "_connect", lambda path: Flaky(connect(path), 2))
+    s = ResponseStore(tmp_path / "r.db", flush_interval=0.05)
+    s.submit("family_impact", [3] * 12, [9] * 4, session_id="s")
+    assert s.flush(timeout=10)
+    s.close()
+    assert sqlite3.connect(tmp_path / "r.db").execute("SELECT COUNT(*) FROM responses").fetchone() == (1,)
+
+    monkeypatch.setattr(store_mod, "_connect", lambda path: Flaky(connect(path), 10**9))
+    monkeypatch.setattr(store_mod, "RETRIES_AFTER_CLOSE", 1)
+    s = ResponseStore(tmp_path / "r.db", flush_interval=0.05)
+    s.submit("family_impact", [3] * 12, [9] * 4, session_id="s")
+    assert not s.flush(timeout=0.5)
+    s.close()
+    assert not s._writer.is_alive()
+
+def test_history_threads_share_one_reader(tmp_path, monkeypatch):
+    opened = []
+    connect = store_mod._connect
+    monkeypatch.setattr(store_mod, "_connect", lambda path: opened.append(path) or connect(path))
+    s = ResponseStore(tmp_path / "r.db", flush_interval=0.05)
+    threads = [threading.Thread(target=s.history, args=("family_impact",), kwargs={"session_id": "s"}) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(opened) == 3         # schema check, writer, one shared reader
+    reader = s._reader
+    s.close()
+    assert s._reader is None
+    with pytest.raises(sqlite3.ProgrammingError):
+        reader.execute("SELECT 1")
@@ -0,0 +1,87 @@
+"""Advice rules as data, compiled once into arrays.
+
+A rule fires when a facet metric (average for family impact, risk value for
+legacy readiness) compares against its threshold. Rule sets evaluate one
+respondent from a {facet: value} mapping, or a whole (respondents x facets)
+matrix in one vectorized pass that returns a boolean hit mask per rule.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import numpy as np
+from utils.questionnaires import FAMILY_IMPACT, LEGACY_READINESS, Questionnaire
+
+OPS = ("<", ">=")
+
+@dataclass(frozen=True, eq=False)
+class RuleSet:
+    questionnaire: Questionnaire
+    metric: str                  # score_matrix key the rules read: "avg" or "risk"
+    facets: Tuple[str, ...]      # per rule
+    texts: Tuple[str, ...]       # per rule
+    facet_pos: np.ndarray        # (rules,) column of the facet in the score matrix
+    thresholds: np.ndarray       # (rules,)
+    less_than: np.ndarray        # (rules,) True for "<", False for ">="
+    fallback: str
+    footer: str
+
+def compile_rules(questionnaire: Questionnaire, metric: str, rules, fallback: str, footer: str) -> RuleSet:
+    """`rules` is a table of (facet, op, threshold, text) rows."""
+    rules = list(rules)
+    for facet, op, _, _ in rules:
+        if facet not in questionnaire.facets:
+            raise ValueError(f"unknown facet for {questionnaire.key}: {facet}")
+        if op not in OPS:
+            raise ValueError(f"unsupported operator: {op}")
+    arrays = (
+        np.array([questionnaire.facets.index(r[0]) for r in rules], dtype=np.intp),
+        np.array([r[2] for r in rules], dtype=float),
+        np.array([r[1] == "<" for r in rules], dtype=bool),
+    )
+    for a in arrays:
+        a.setflags(write=False)
+    return RuleSet(questionnaire, metric, tuple(r[0] for r in rules), tuple(r[3] for r in rules), *arrays,
+                   fallback, footer)
+
+def evaluate(rule_set: RuleSet, values) -> np.ndarray:
+    """Hit mask (respondents x rules) for a (respondents x facets) metric matrix."""
+    v = np.asarray(values, dtype=float)[:, rule_set.facet_pos]
+    below = v < rule_set.thresholds
+    return np.where(rule_set.less_than, below, ~below)
+
+def evaluate_one(rule_set: RuleSet, values: Dict[str, float]) -> np.ndarray:
+    """Hit mask for one respondent; facets missing from `values` count as 0."""
+    v = np.array([values.get(f, 0) for f in rule_set.facets], dtype=float)
+    below = v < rule_set.thresholds
+    return np.where(rule_set.less_than, below, ~below)
+
+def advice_text(rule_set: RuleSet, hits) -> str:
+    lines = [t for t, hit in zip(rule_set.texts, hits) if hit] or [rule_set.fallback]
+    return "\n".join(lines + [rule_set.footer])
+
+def advice_texts(rule_set: RuleSet, masks) -> List[str]:
+    """Advice text per respondent; each distinct hit pattern is rendered once."""
+    masks = np.asarray(masks, dtype=bool)
+    patterns, inverse = np.unique(masks, axis=0, return_inverse=True)
+    rendered = [advice_text(rule_set, p) for p in patterns]
+    return [rendered[i] for i in np.ravel(inverse)]
+
+FAMILY_IMPACT_ADVICE = compile_rules(FAMILY_IMPACT, "avg", [
+    ("情感連結", "<", 3.0, "• 先安排一次以「價值觀與家族期待」為主的會議，避免一開始聚焦在稅務或產品。"),
+    ("財務參與度", "<", 3.5, "• 建立資產列表與決策流程（誰參與、如何紀錄），提升透明度與參與感。"),
+    ("家族角色認同", "<", 3.5, "• 明確界定角色與授權（董事會、家族委員會、受託人等），降低決策壓力集中。"),
+    ("傳承願景", "<", 3.5, "• 用 OKR/願景版把 3-5 年目標寫下來，安排交棒時程與里程碑。"),
+], fallback="• 建議直接進入《傳承策略設計》與保單/信託現金流模型，建立長期護城河。",
+   footer="• 若需協助，我們可提供顧問會議與策略落地服務（Email：123@gracefo.com）。")
+
+LEGACY_READINESS_ACTIONS = compile_rules(LEGACY_READINESS, "risk", [
+    ("資產透明度", ">=", 1.0, "• 建立最新資產清單與權屬（含跨境資產），指定維護頻率與責任人。"),
+    ("稅務與合規", ">=", 1.0, "• 進行跨境稅務/申報盤點（CRS/FBAR/遺贈稅），建立年度合規清單。"),
+    ("接班計畫", ">=", 1.0, "• 設定交棒時程表與角色授權，建立家族治理/董事會會議節奏。"),
+    ("保險與信託", ">=", 1.0, "• 用保單/信託打造長期現金流與風險隔離，定期壓力測試。"),
+], fallback="• 建議直接進入《傳承策略設計》與現金流模型優化，建立長期護城河。",
+   footer="• 需要協助？來信 123@gracefo.com 安排顧問會議。")
+
+RULE_SETS = {
+    FAMILY_IMPACT.key: FAMILY_IMPACT_ADVICE,
+    LEGACY_READINESS.key: LEGACY_READINESS_ACTIONS,
+}
@@ -0,0 +1,73 @@
+"""Headless PDF report generation for a whole file of responses.
+
+    python -m utils.batch_reports responses.csv --questionnaire family_impact --out reports/
+
+The input (CSV, Excel or Parquet) needs answer columns Q1..Qn (1-5) in
+questionnaire order and, optionally, an id column used for the output file
+names (an id that repeats gets its row number appended, so no report is
+overwritten). It is read in chunks, so memory does not grow with the file
+size (legacy .xls files are read whole).
+"""
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import argparse, pathlib, re, sys
+from concurrent.futures import ProcessPoolExecutor
+from utils.questionnaires import REGISTRY
+from utils.pipeline import iter_response_chunks
+
+CHUNK_ROWS = 2_000
+
+def _safe_name(rid: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", rid).strip("._") or "respondent"
+
+def _unique_names(questionnaire: str, ids, first_row: int, used: set):
+    """Output file names; an id that repeats (or collides after sanitising) gets its row number appended."""
+    names = []
+    for row, rid in enumerate(ids, start=first_row):
+        base = name = f"{questionnaire}_{_safe_name(rid)}"
+        while name in used:
+            name = f"{base}_row{row}" if name == base else f"{name}_"
+        used.add(name)
+        names.append(f"{name}.pdf")
+    return names
+
+def _render_one(job):
+    questionnaire, name, answers, out_dir, raster = job
+    from utils.reports import REPORT_BUILDERS
+    target = pathlib.Path(out_dir) / name
+    target.write_bytes(REPORT_BUILDERS[questionnaire](list(answers), raster=raster))
+    return str(target)
+
+def generate_reports(path, questionnaire: str, out_dir, workers: int | None = None,
+                     id_column: str = "respondent_id", raster: bool = False):
+    out = pathlib.Path(out_dir); out.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    used, rows = set(), 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for ids, matrix in iter_response_chunks(path, questionnaire, id_column, chunksize=CHUNK_ROWS):
+            names = _unique_names(questionnaire, ids, rows + 1, used)
+            rows += len(ids)
+            jobs = [(questionnaire, name, row, str(out), raster) for name, row in zip(names, matrix.tolist())]
+            yield from pool.map(_render_one, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate one PDF report per respondent.")
+    ap.add_argument("responses", help="CSV, Excel (.xlsx/.xls) or Parquet file with Q1..Qn answer columns")
+    ap.add_argument("--questionnaire", "-q", choices=sorted(REGISTRY), required=True)
+    ap.add_argument("--out", "-o", default="reports", help="output directory")
+    ap.add_argument("--workers", "-j", type=int, default=None, help="process count (default: all cores)")
+    ap.add_argument("--id-column", default="respondent_id")
+    ap.add_argument("--raster", action="store_true", help="embed 200-dpi PNG charts instead of vector graphics")
+    args = ap.parse_args(argv)
+
+    n = 0
+    for path in generate_reports(args.responses, args.questionnaire, args.out, args.workers, args.id_column, args.raster):
+        n += 1
+        if n % 100 == 0:
+            print(f"{n} reports written", file=sys.stderr)
+    print(f"done: {n} reports in {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,59 +1,21 @@
 
-import os, pathlib, urllib.request
+import io, os
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib import font_manager
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from utils.fonts import apply_matplotlib_font, font_path
+from utils.render_cache import render_cache
+from utils.metrics import timed
 
-CANDIDATE_NAMES = [
-    "NotoSansTC-Regular.ttf",
-    "NotoSansTC-Regular.otf",
-    "NotoSansCJKtc-Regular.otf",
-    "NotoSansCJKtc-Regular.ttf",
-]
-
-DOWNLOAD_URLS = [
-    "https://github.com/googlefonts/noto-cjk/raw/main/Sans/TTF/TraditionalChinese/NotoSansTC-Regular.ttf",
-    "https://github.com/googlefonts/noto-cjk/raw/main/Sans/OTF/TraditionalChinese/NotoSansTC-Regular.otf",
-    "https://github.com/googlefonts/noto-cjk/raw/main/Sans/TTF/TraditionalChinese/NotoSansCJKtc-Regular.ttf",
-]
-
-def _find_or_fetch_font() -> str | None:
-    here = pathlib.Path(__file__).resolve()
-    roots = [here.parent, here.parent.parent, pathlib.Path.cwd()]
-    for r in roots:
-        for name in CANDIDATE_NAMES:
-            p = r / name
-            if p.exists():
-                return str(p)
-
-    cache_dir = pathlib.Path(".fonts")
-    cache_dir.mkdir(exist_ok=True)
-    for url in DOWNLOAD_URLS:
-        try:
-            target = cache_dir / url.split("/")[-1]
-            if not target.exists():
-                urllib.request.urlretrieve(url, target)
-            if target.exists():
-                return str(target)
-        except Exception:
-            continue
-    return None
-
-def _apply_font():
-    try:
-        fp = _find_or_fetch_font()
-        if fp and os.path.exists(fp):
-            font_manager.fontManager.addfont(fp)
-            plt.rcParams["font.family"] = font_manager.FontProperties(fname=fp).get_name()
-        else:
-            plt.rcParams["font.family"] = ["PingFang TC", "Microsoft JhengHei", "Arial Unicode MS"]
-        plt.rcParams["axes.unicode_minus"] = False
-    except Exception:
-        pass
-
-_apply_font()
+def _new_figure(figsize) -> Figure:
+    """A standalone Agg-backed figure; never registered with pyplot's global state."""
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
 
-def radar_plot(scores: dict):
+def radar_plot(scores: dict, overlays=None):
+    """`overlays`: optional [(label, [avg per facet]), ...] drawn as dashed outlines (e.g. past results)."""
+    apply_matplotlib_font()
     labels = list(scores.keys())
     values = [scores[k]["avg"] for k in labels]
     values += values[:1]
@@ -62,23 +24,102 @@ def radar_plot(scores: dict):
     angles = np.linspace(0, 2*np.pi, num_vars, endpoint=False).tolist()
     angles += angles[:1]
 
-    fig = plt.figure(figsize=(6, 6))
-    ax = plt.subplot(111, polar=True)
+    fig = _new_figure((6, 6))
+    ax = fig.add_subplot(111, polar=True)
     ax.set_theta_offset(np.pi / 2); ax.set_theta_direction(-1)
     ax.set_thetagrids(np.degrees(angles[:-1]), labels)
     ax.set_rlabel_position(0); ax.set_ylim(0, 5)
-    ax.plot(angles, values, linewidth=2); ax.fill(angles, values, alpha=0.1)
+    ax.plot(angles, values, linewidth=2, color="C0", label="本次" if overlays else None)
+    ax.fill(angles, values, color="C0", alpha=0.1)
+    for k, (label, past) in enumerate(overlays or [], start=1):
+        past = list(past) + list(past[:1])
+        ax.plot(angles, past, linewidth=1.2, linestyle="--", color=f"C{k}", alpha=0.7, label=label)
+    if overlays:
+        ax.legend(loc="upper right", bbox_to_anchor=(1.25, 1.1), fontsize=8)
     return fig
 
-def heatmap_from_dict(risk_dict: dict):
+def heatmap_from_dict(risk_dict: dict, history=None):
+    """`history`: optional [(label, [risk per facet]), ...] drawn as extra rows above the current one."""
+    apply_matplotlib_font()
     labels = list(risk_dict.keys())
-    values = np.array([risk_dict[k] for k in labels]).reshape(1, -1)
-    fig = plt.figure(figsize=(6, 2.2))
-    ax = plt.subplot(111)
+    rows = [list(v) for _, v in history or []] + [[risk_dict[k] for k in labels]]
+    values = np.array(rows, dtype=float)
+    fig = _new_figure((6, 2.2 + 0.5 * (len(rows) - 1)))
+    ax = fig.add_subplot(111)
     im = ax.imshow(values, aspect='auto')
-    ax.set_yticks([])
+    if history:
+        ax.set_yticks(range(len(rows))); ax.set_yticklabels([l for l, _ in history] + ["本次"])
+    else:
+        ax.set_yticks([])
     ax.set_xticks(range(len(labels))); ax.set_xticklabels(labels, rotation=20, ha='right')
-    for j, v in enumerate(values[0]):
-        ax.text(j, 0, f"{v:.1f}", ha='center', va='center')
+    for i, row in enumerate(values):
+        for j, v in enumerate(row):
+            ax.text(j, i, f"{v:.1f}", ha='center', va='center')
     ax.set_title("風險熱力圖｜0 = 低風險；數值越高風險越高")
     return fig
+
+def family_radar(facets, member_avgs, member_labels=None, mean=None):
+    """All members' polygons plus the family mean on one radar (one figure for N members)."""
+    apply_matplotlib_font()
+    labels = list(facets)
+    member_avgs = np.asarray(member_avgs, dtype=float)
+    angles = np.linspace(0, 2*np.pi, len(labels), endpoint=False)
+    closed = np.append(angles, angles[:1])
+
+    fig = _new_figure((6, 6))
+    ax = fig.add_subplot(111, polar=True)
+    ax.set_theta_offset(np.pi / 2); ax.set_theta_direction(-1)
+    ax.set_thetagrids(np.degrees(angles), labels)
+    ax.set_rlabel_position(0); ax.set_ylim(0, 5)
+    names = member_labels if member_labels is not None else [f"成員{i+1}" for i in range(len(member_avgs))]
+    for k, (name, row) in enumerate(zip(names, member_avgs)):
+        ax.plot(closed, np.append(row, row[:1]), linewidth=1, alpha=0.55, color=f"C{k % 10}", label=str(name))
+    if mean is None:
+        mean = member_avgs.mean(axis=0)
+    mean = np.asarray(mean, dtype=float)
+    ax.plot(closed, np.append(mean, mean[:1]), linewidth=2.5, color="black", label="家族平均")
+    ax.fill(closed, np.append(mean, mean[:1]), color="black", alpha=0.06)
+    if len(member_avgs) <= 12:
+        ax.legend(loc="upper right", bbox_to_anchor=(1.3, 1.1), fontsize=8)
+    return fig
+
+def fig_to_png(fig, dpi=200) -> bytes:
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+    return buf.getvalue()
+
+def _cached_png(kind, labels, values, draw, dpi):
+    key = render_cache.key(kind, labels, values, dpi=dpi, font=os.path.basename(font_path() or ""))
+    def render():
+        with timed("figure"):
+            fig = draw()
+        try:
+            with timed("rasterize"):
+                return fig_to_png(fig, dpi=dpi)
+        finally:
+            fig.clear()
+    return render_cache.get_or_render(key, render)
+
+def _flatten(series):
+    labels, values = [], []
+    for label, vals in series or []:
+        labels.append(label); values.extend(vals)
+    return labels, values
+
+def radar_png(scores: dict, dpi=200, overlays=None) -> bytes:
+    """PNG bytes of `radar_plot(scores, overlays)`, served from the render cache when possible."""
+    extra_labels, extra = _flatten(overlays)
+    return _cached_png("radar", list(scores.keys()) + extra_labels, [v["avg"] for v in scores.values()] + extra,
+                       lambda: radar_plot(scores, overlays), dpi)
+
+def heatmap_png(risk_dict: dict, dpi=200, history=None) -> bytes:
+    """PNG bytes of `heatmap_from_dict(risk_dict, history)`, served from the render cache when possible."""
+    extra_labels, extra = _flatten(history)
+    return _cached_png("heatmap", list(risk_dict.keys()) + extra_labels, list(risk_dict.values()) + extra,
+                       lambda: heatmap_from_dict(risk_dict, history), dpi)
+
+def family_radar_png(facets, member_avgs, member_labels=None, dpi=200) -> bytes:
+    member_avgs = np.asarray(member_avgs, dtype=float)
+    names = [str(n) for n in member_labels] if member_labels is not None else []
+    return _cached_png("family_radar", list(facets) + names, member_avgs.ravel().tolist(),
+                       lambda: family_radar(facets, member_avgs, member_labels), dpi)
@@ -0,0 +1,209 @@
+"""Anonymous cohort benchmark: percentiles against all submissions.
+
+Facet sums are small integers, so the whole population is a fixed-size
+histogram per questionnaire (facets x (max_sum + 1) counts): adding one
+submission touches one bin per facet, percentiles are a cumulative sum over
+a few dozen bins, and histograms from different processes merge by addition.
+
+Enabled by IMPACT_COHORT_PATH (a SQLite file). Each process keeps the counts
+it has added but not yet written; a background thread UPSERTs those deltas
+(`count = count + excluded.count`) and re-reads the shared totals, so pages
+never scan responses and never wait on disk. Only bin counts are stored.
+Backfill from a response file with `python -m utils.cohort FILE -q KEY`.
+"""
+import argparse, atexit, os, sqlite3, sys, threading
+import numpy as np
+from utils.questionnaires import REGISTRY, get_questionnaire
+
+MIN_COHORT = 20   # below this many submissions percentiles are not shown
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cohort_counts (
+    questionnaire TEXT NOT NULL,
+    facet INTEGER NOT NULL,
+    bin INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (questionnaire, facet, bin)
+) WITHOUT ROWID;
+"""
+
+def empty_histogram(questionnaire) -> np.ndarray:
+    q = get_questionnaire(questionnaire)
+    return np.zeros((len(q.facets), int(q.max_scores.max()) + 1), dtype=np.int64)
+
+def histogram(questionnaire, sums) -> np.ndarray:
+    """Histogram of a (respondents x facets) facet-sum matrix."""
+    hist = empty_histogram(questionnaire)
+    sums = np.asarray(sums, dtype=np.int64).reshape(-1, hist.shape[0])
+    np.add.at(hist, (np.broadcast_to(np.arange(hist.shape[0]), sums.shape), sums), 1)
+    return hist
+
+def percentiles(hist, sums) -> np.ndarray:
+    """Mid-rank percentile (0-100) of each facet sum within its facet's histogram."""
+    sums = np.asarray(sums, dtype=np.int64)
+    rows = np.arange(hist.shape[0])
+    below = np.cumsum(hist, axis=1) - hist
+    total = np.maximum(1, hist.sum(axis=1))
+    return 100.0 * (below[rows, sums] + 0.5 * hist[rows, sums]) / total
+
+def _connect(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+class Cohort:
+    def __init__(self, path, flush_interval: float = 2.0):
+        self.path = str(path)
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = {k: empty_histogram(k) for k in REGISTRY}
+        self._totals = {k: empty_histogram(k) for k in REGISTRY}
+        self._revisions = dict.fromkeys(REGISTRY, 0)    # bumped whenever a questionnaire's totals change
+        self._closed = threading.Event()
+        self._wake = threading.Event()
+        conn = _connect(self.path)
+        try:
+            self._totals = self._read(conn)
+        finally:
+            conn.close()
+        self._writer = threading.Thread(target=self._run, name="cohort-writer", daemon=True)
+        self._writer.start()
+
+    def add(self, questionnaire: str, sums, previous=None):
+        """Count one submission (O(facets)); `previous` sums are un-counted first,
+        so a respondent who revises their answers still counts once."""
+        q = get_questionnaire(questionnaire)
+        facets = np.arange(len(q.facets))
+        with self._lock:
+            for hist in (self._pending[q.key], self._totals[q.key]):
+                if previous is not None:
+                    np.subtract.at(hist, (facets, np.asarray(previous, dtype=np.int64)), 1)
+                np.add.at(hist, (facets, np.asarray(sums, dtype=np.int64)), 1)
+            self._revisions[q.key] += 1
+
+    def remove(self, questionnaire: str, sums):
+        """Un-count a submission added earlier (its respondent withdrew consent)."""
+        q = get_questionnaire(questionnaire)
+        facets = np.arange(len(q.facets))
+        with self._lock:
+            for hist in (self._pending[q.key], self._totals[q.key]):
+                np.subtract.at(hist, (facets, np.asarray(sums, dtype=np.int64)), 1)
+            self._revisions[q.key] += 1
+
+    def merge(self, questionnaire: str, hist):
+        """Add a whole histogram (e.g. built by a batch worker)."""
+        key = get_questionnaire(questionnaire).key
+        with self._lock:
+            self._pending[key] += hist
+            self._totals[key] += hist
+            self._revisions[key] += 1
+
+    def revision(self, questionnaire: str) -> int:
+        """Changes whenever the totals behind `percentiles` change; lets pages cache on it."""
+        with self._lock:
+            return self._revisions[get_questionnaire(questionnaire).key]
+
+    def size(self, questionnaire: str) -> int:
+        with self._lock:
+            return int(self._totals[get_questionnaire(questionnaire).key][0].sum())
+
+    def percentiles(self, questionnaire: str, sums):
+        """Per-facet percentiles for `sums`, or None while the cohort is under MIN_COHORT."""
+        key = get_questionnaire(questionnaire).key
+        with self._lock:
+            hist = self._totals[key].copy()
+        if hist[0].sum() < MIN_COHORT:
+            return None
+        return percentiles(hist, sums)
+
+    def _read(self, conn):
+        totals = {k: empty_histogram(k) for k in REGISTRY}
+        for key, facet, b, count in conn.execute("SELECT questionnaire, facet, bin, count FROM cohort_counts"):
+            if key in totals and facet < totals[key].shape[0] and b < totals[key].shape[1]:
+                totals[key][facet, b] = count
+        return totals
+
+    def _flush(self, conn):
+        with self._lock:
+            pending, self._pending = self._pending, {k: empty_histogram(k) for k in REGISTRY}
+        rows = [(key, int(f), int(b), int(hist[f, b])) for key, hist in pending.items() for f, b in zip(*np.nonzero(hist))]
+        try:
+            if rows:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO cohort_counts (questionnaire, facet, bin, count) VALUES (?, ?, ?, ?)"
+                        " ON CONFLICT (questionnaire, facet, bin) DO UPDATE SET count = count + excluded.count", rows)
+            totals = self._read(conn)
+        except sqlite3.OperationalError:
+            with self._lock:   # keep the deltas for the next round
+                for key, hist in pending.items():
+                    self._pending[key] += hist
+            return
+        with self._lock:   # shared totals plus whatever was added meanwhile
+            for k in REGISTRY:
+                fresh = totals[k] + self._pending[k]
+                if not np.array_equal(fresh, self._totals[k]):
+                    self._totals[k] = fresh
+                    self._revisions[k] += 1
+
+    def _run(self):
+        conn = _connect(self.path)
+        try:
+            while not self._closed.is_set():
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                self._flush(conn)
+            self._flush(conn)
+        finally:
+            conn.close()
+
+    def flush(self):
+        """Write pending counts now (tools/tests; not for page code)."""
+        conn = _connect(self.path)
+        try:
+            self._flush(conn)
+        finally:
+            conn.close()
+
+    def close(self, timeout: float | None = 10.0):
+        self._closed.set()
+        self._wake.set()
+        self._writer.join(timeout)
+
+_cohort = None
+_cohort_lock = threading.Lock()
+
+def get_cohort() -> Cohort | None:
+    """The process-wide cohort, or None when benchmarking is not enabled."""
+    global _cohort
+    path = os.environ.get("IMPACT_COHORT_PATH")
+    if not path:
+        return None
+    with _cohort_lock:
+        if _cohort is None:
+            _cohort = Cohort(path)
+            atexit.register(_cohort.close)
+        return _cohort
+
+def main(argv=None):
+    from utils.pipeline import iter_response_chunks
+    from utils.scoring import score_matrix
+    ap = argparse.ArgumentParser(description="Add a response file to the cohort histograms.")
+    ap.add_argument("path")
+    ap.add_argument("-q", "--questionnaire", required=True, choices=sorted(REGISTRY))
+    ap.add_argument("--db", default=os.environ.get("IMPACT_COHORT_PATH"), help="cohort SQLite file (default: IMPACT_COHORT_PATH)")
+    args = ap.parse_args(argv)
+    if not args.db:
+        ap.error("no cohort database: pass --db or set IMPACT_COHORT_PATH")
+    hist, n = empty_histogram(args.questionnaire), 0
+    for _, answers in iter_response_chunks(args.path, args.questionnaire):
+        hist += histogram(args.questionnaire, score_matrix(args.questionnaire, answers)["sum"])
+        n += len(answers)
+    cohort = Cohort(args.db)
+    cohort.merge(args.questionnaire, hist)
+    cohort.close()
+    print(f"added {n} responses; cohort size {cohort.size(args.questionnaire)}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""One consolidated PDF for an advisor's whole book of families.
+
+    python -m utils.cohort_report responses.csv -q family_impact -o cohort.pdf
+
+The input is a response file as for `utils.pipeline` (CSV, Excel or
+Parquet with Q1..Qn answer columns). Adjacent rows with the same family id
+(default column `family_id`; sort the file by it) are one family; without
+that column every respondent gets a section of their own.
+
+The document is a cover page, one section per family (family-mean chart
+with members' lines, facet table, summary and advice) and cohort-wide
+aggregate tables at the end. Sections are laid out one after another on a
+single canvas that is written to the output file: the font, header/footer,
+logo and radar grid are embedded once and shared by every page, the input
+is read in chunks, and each family's data is dropped once it is drawn.
+"""
+import argparse, pathlib, sys
+import numpy as np
+from utils.questionnaires import REGISTRY, get_questionnaire
+from utils.scoring import aggregate_members, facet_tiers, family_impact_summary, interpret_scores, legacy_readiness_summary
+from utils.pipeline import DEFAULT_CHUNKSIZE, iter_response_chunks
+from utils.cohort import empty_histogram, histogram
+
+TITLES = {
+    "family_impact": ("家族影響力指數｜家族彙整報告", "家族雷達圖・面向分析・顧問下一步建議"),
+    "legacy_readiness": ("傳承準備度測驗｜家族彙整報告", "家族風險熱力圖・分數摘要・顧問下一步建議"),
+}
+TIER_LABELS = {   # facet_tiers order: 0 / 1 / 2
+    "family_impact": ("優勢", "可優化", "優先改善"),
+    "legacy_readiness": ("高風險", "中度風險", "低風險"),
+}
+RADAR_GRID_FORM = "cohortRadarGrid"
+
+def iter_families(path, questionnaire, family_column: str = "family_id", chunksize: int = DEFAULT_CHUNKSIZE):
+    """Yield (family id, members x questions answers) for each run of adjacent rows with one id."""
+    pending_id, pending = None, []
+    for ids, answers in iter_response_chunks(path, questionnaire, family_column, chunksize):
+        if not len(ids):
+            continue
+        bounds = np.r_[np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]), len(ids)]
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            if pending and ids[a] == pending_id:     # a family continuing from the previous chunk
+                pending.append(answers[a:b]); continue
+            if pending:
+                yield pending_id, np.concatenate(pending)
+            pending_id, pending = ids[a], [answers[a:b]]
+    if pending:
+        yield pending_id, np.concatenate(pending)
+
+def family_metrics(mean) -> dict:
+    """Family-mean metrics the section text and the cohort tier counts both use (risk rounded as in score_matrix)."""
+    return {"avg": mean, "risk": np.round(5 - mean, 2)}
+
+def family_section(q, matrix):
+    """(chart values, table columns, summary, advice) for one family's members."""
+    agg = aggregate_members(q, matrix)
+    mean = agg["mean"]
+    columns = {
+        "面向": agg["facets"],
+        "家族平均(1-5)": np.round(mean, 2),
+        "最低": np.round(agg["min"], 2),
+        "最高": np.round(agg["max"], 2),
+        "共識度": np.round(agg["alignment"], 2),
+    }
+    if q.key == "family_impact":
+        scores = {f: {"avg": float(a)} for f, a in zip(agg["facets"], mean)}
+        return (scores, agg["member_avg"]), columns, family_impact_summary(scores), interpret_scores(scores)
+    risk = dict(zip(agg["facets"], family_metrics(mean)["risk"].tolist()))
+    columns["風險值(0-4)"] = list(risk.values())
+    _, summary, actions = legacy_readiness_summary(risk)
+    return risk, columns, summary, actions
+
+class CohortTotals:
+    """Running cohort aggregates: respondents' facet-sum histogram and family tier counts."""
+
+    def __init__(self, questionnaire):
+        self.q = get_questionnaire(questionnaire)
+        self.hist = empty_histogram(self.q)
+        self.tiers = np.zeros((len(self.q.facets), 3), dtype=np.int64)
+        self.families = self.respondents = 0
+
+    def add(self, matrix):
+        sums = np.asarray(matrix) @ self.q.onehot
+        self.hist += histogram(self.q, sums)
+        mean = (sums / self.q.facet_counts).mean(axis=0, keepdims=True)
+        tiers = facet_tiers(self.q, family_metrics(mean))[0]
+        self.tiers[np.arange(len(tiers)), tiers] += 1
+        self.families += 1
+        self.respondents += len(matrix)
+
+    def _quantile(self, p):
+        cum = np.cumsum(self.hist, axis=1)
+        return np.argmax(cum >= p * np.maximum(1, cum[:, -1:]), axis=1) / self.q.facet_counts
+
+    def tables(self):
+        bins = np.arange(self.hist.shape[1])
+        mean = (self.hist * bins).sum(axis=1) / max(1, self.respondents) / self.q.facet_counts
+        facets = list(self.q.facets)
+        respondents = {"面向": facets, "平均(1-5)": np.round(mean, 2)}
+        for label, p in (("P25", 0.25), ("中位數", 0.5), ("P75", 0.75)):
+            respondents[label] = np.round(self._quantile(p), 2)
+        families = {"面向": facets}
+        for j, label in enumerate(TIER_LABELS[self.q.key]):
+            families[f"{label}(家族數)"] = self.tiers[:, j]
+        return [("受訪者面向分數分布", respondents), ("家族面向等級分布（依家族平均）", families)]
+
+def cohort_report(path, questionnaire, out, family_column: str = "family_id",
+                  chunksize: int = DEFAULT_CHUNKSIZE, source_name: str | None = None):
+    """Write the cohort PDF to `out` (path or binary file); yields (family id, members) per section."""
+    from utils.pdf_utils import ReportWriter
+    from utils.pdf_charts import radar_drawing, heatmap_drawing
+    q = get_questionnaire(questionnaire)
+    title, subtitle = TITLES[q.key]
+    totals = CohortTotals(q)
+    w = ReportWriter(out)
+    try:
+        name = source_name or pathlib.Path(str(getattr(path, "name", path))).name
+        w.cover(title, subtitle, f"資料來源：{name}\n每個家族一節：家族平均圖表、面向分數、摘要與建議。\n最後一節為全體彙整表。")
+        for fid, matrix in iter_families(path, q, family_column, chunksize):
+            chart, columns, summary, advice = family_section(q, matrix)
+            w.new_page()
+            w.heading(f"家族 {fid}｜{len(matrix)} 位成員")
+            if q.key == "family_impact":
+                scores, members = chart
+                w.shared_form(RADAR_GRID_FORM, radar_drawing(scores, w.font, values=False))
+                w.chart(radar_drawing(scores, w.font, grid=False, members=members if len(members) > 1 else ()),
+                        height=250, form=RADAR_GRID_FORM)
+            else:
+                w.chart(heatmap_drawing(chart, w.font), height=160)
+            w.table("面向分數", columns)
+            w.text("摘要", summary)
+            w.text("顧問下一步建議", advice)
+            totals.add(matrix)
+            yield fid, len(matrix)
+
+        w.new_page()
+        w.heading("全體彙整", size=15, space=22)
+        w.text(None, f"家族數：{totals.families}　受訪人數：{totals.respondents}", indent=0)
+        for ttitle, table in totals.tables():
+            w.table(ttitle, table)
+    finally:
+        w.close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Write one PDF with a section per family and cohort aggregates.")
+    ap.add_argument("responses", help="CSV, Excel or Parquet file with Q1..Qn answer columns")
+    ap.add_argument("--questionnaire", "-q", choices=sorted(REGISTRY), required=True)
+    ap.add_argument("--out", "-o", default="cohort_report.pdf")
+    ap.add_argument("--family-column", default="family_id", help="rows with the same id (adjacent) form one family")
+    ap.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = ap.parse_args(argv)
+
+    n = 0
+    for _ in cohort_report(args.responses, args.questionnaire, args.out, args.family_column, args.chunksize):
+        n += 1
+        if n % 100 == 0:
+            print(f"{n} families written", file=sys.stderr)
+    print(f"done: {n} families -> {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Process-wide CJK font resolution shared by the chart and PDF modules.
+
+The font file is resolved once and each library parses it at most once per
+process. Nothing is downloaded unless IMPACT_FONT_DOWNLOAD=1 is set (or
+`python -m utils.fonts --download` is run at image build time), and any
+download is bounded by IMPACT_FONT_TIMEOUT seconds.
+"""
+import os, pathlib, sys, threading, urllib.request
+from utils.metrics import timed
+
+CANDIDATE_NAMES = [
+    "NotoSansTC-Regular.ttf",
+    "NotoSansCJKtc-Regular.ttf",
+    "NotoSansTC-Regular.otf",
+    "NotoSansCJKtc-Regular.otf",
+]
+DOWNLOAD_URLS = [
+    "https://github.com/googlefonts/noto-cjk/raw/main/Sans/TTF/TraditionalChinese/NotoSansTC-Regular.ttf",
+    "https://github.com/googlefonts/noto-cjk/raw/main/Sans/TTF/TraditionalChinese/NotoSansCJKtc-Regular.ttf",
+    "https://github.com/googlefonts/noto-cjk/raw/main/Sans/OTF/TraditionalChinese/NotoSansTC-Regular.otf",
+]
+FALLBACK_FAMILIES = ["PingFang TC", "Microsoft JhengHei", "Arial Unicode MS"]
+PDF_FONT_NAME = "NotoSansTC"
+PDF_SUFFIXES = (".ttf", ".ttc")     # reportlab's TTFont cannot read CFF-based .otf files
+
+CACHE_DIR = pathlib.Path(os.environ.get("IMPACT_FONT_CACHE", ".fonts"))
+
+_lock = threading.RLock()
+_resolved = {}
+
+def _download_allowed() -> bool:
+    return os.environ.get("IMPACT_FONT_DOWNLOAD", "").lower() in ("1", "true", "yes")
+
+def _timeout() -> float:
+    try:
+        return float(os.environ.get("IMPACT_FONT_TIMEOUT", "10"))
+    except ValueError:
+        return 10.0
+
+def _find_local(suffixes: tuple = ()) -> str | None:
+    here = pathlib.Path(__file__).resolve()
+    roots = [here.parent, here.parent.parent, pathlib.Path.cwd(), CACHE_DIR]
+    for r in roots:
+        for name in CANDIDATE_NAMES:
+            if suffixes and not name.endswith(suffixes):
+                continue
+            p = r / name
+            if p.exists():
+                return str(p)
+    return None
+
+def _fetch(timeout: float, suffixes: tuple = ()) -> str | None:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    for url in DOWNLOAD_URLS:
+        if suffixes and not url.endswith(suffixes):
+            continue
+        target = CACHE_DIR / url.split("/")[-1]
+        tmp = target.with_suffix(target.suffix + ".part")
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as resp, open(tmp, "wb") as fh:
+                while chunk := resp.read(1 << 16):
+                    fh.write(chunk)
+            os.replace(tmp, target)
+            return str(target)
+        except Exception:
+            tmp.unlink(missing_ok=True)
+            continue
+    return None
+
+def font_path(allow_download: bool | None = None) -> str | None:
+    """Return the CJK font file, resolving it only once per process."""
+    allow = _download_allowed() if allow_download is None else allow_download
+    with _lock:
+        if "path" in _resolved and (_resolved["path"] or not allow):
+            return _resolved["path"]
+        with timed("font_resolve"):
+            fp = _find_local()
+            if fp is None and allow:
+                fp = _fetch(_timeout())
+        _resolved["path"] = fp
+        return fp
+
+def apply_matplotlib_font() -> None:
+    """Point matplotlib at the CJK font (first call only)."""
+    with _lock:
+        if _resolved.get("mpl"):
+            return
+        try:
+            import matplotlib as mpl
+            from matplotlib import font_manager
+            fp = font_path()
+            if fp:
+                font_manager.fontManager.addfont(fp)
+                mpl.rcParams["font.family"] = font_manager.FontProperties(fname=fp).get_name()
+            else:
+                mpl.rcParams["font.family"] = FALLBACK_FAMILIES
+            mpl.rcParams["axes.unicode_minus"] = False
+        except Exception:
+            pass
+        _resolved["mpl"] = True
+
+def pdf_font_path() -> str | None:
+    """The CJK font file for reportlab: the shared font if it is TrueType, else a TrueType candidate."""
+    fp = font_path()
+    if fp is None or fp.lower().endswith(PDF_SUFFIXES):
+        return fp
+    with _lock:
+        if "pdf_path" not in _resolved:
+            fp = _find_local(PDF_SUFFIXES)
+            if fp is None and _download_allowed():
+                fp = _fetch(_timeout(), PDF_SUFFIXES)
+            _resolved["pdf_path"] = fp
+        return _resolved["pdf_path"]
+
+def pdf_font_name() -> str:
+    """Register the CJK TTFont with reportlab once and return its name."""
+    with _lock:
+        if "pdf" in _resolved:
+            return _resolved["pdf"]
+        name = "Helvetica"
+        fp = pdf_font_path()
+        if fp:
+            try:
+                from reportlab.pdfbase import pdfmetrics
+                from reportlab.pdfbase.ttfonts import TTFont
+                with timed("font_register"):
+                    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, fp))
+                name = PDF_FONT_NAME
+            except Exception:
+                pass
+        _resolved["pdf"] = name
+        return name
+
+if __name__ == "__main__":
+    fp = font_path(allow_download="--download" in sys.argv[1:])
+    print(fp or "no CJK font found")
+    sys.exit(0 if fp else 1)
@@ -0,0 +1,208 @@
+"""Background jobs for large response files (the advisor cohort page).
+
+A job scores an uploaded response file (per-respondent and per-facet CSVs
+via the `utils.pipeline` steps) and writes the cohort PDF
+(`utils.cohort_report`) in a worker process, so the Streamlit script thread
+only uploads, submits and polls. Everything lives on disk under
+IMPACT_JOBS_DIR (default `.jobs`), one directory per job:
+
+    <job id>/input.csv|xlsx|parquet   the uploaded file
+    <job id>/state.json               status, phase, progress, outputs (rewritten atomically)
+    <job id>/scores.csv, facets.csv, cohort_report.pdf
+
+The job id is the SHA-256 of the questionnaire key, the family column and
+the file content, so uploading the same file again returns the existing job
+instead of running it twice, and any session (or a later browser visit with
+?job=<id>) can find it. A running job whose worker stopped updating its
+heartbeat, or a queued job whose queueing server process is gone (e.g. after
+a restart), is run again on the next submit. A job waiting behind long ones
+is not. Workers are a spawn process pool of IMPACT_JOB_WORKERS processes
+(default 2).
+"""
+import atexit, hashlib, json, os, pathlib, socket, tempfile, threading, time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.procpool import spawn_pool
+
+OUTPUTS = {"scores": "scores.csv", "facets": "facets.csv", "report": "cohort_report.pdf"}
+STALE_AFTER = 60.0       # seconds without a heartbeat before a running job counts as lost
+HEARTBEAT = 1.0
+JOB_ID_LENGTH = 24      # hex digits of the SHA-256 kept as the id
+
+def job_id(questionnaire: str, data: bytes, family_column: str = "family_id") -> str:
+    h = hashlib.sha256(questionnaire.encode("utf-8") + b"\0" + family_column.encode("utf-8") + b"\0")
+    h.update(data)
+    return h.hexdigest()[:JOB_ID_LENGTH]
+
+def _write_state(job_dir: pathlib.Path, state: dict):
+    fd, tmp = tempfile.mkstemp(dir=job_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        json.dump(state, fh, ensure_ascii=False)
+    os.replace(tmp, job_dir / "state.json")
+
+def read_state(job_dir) -> dict | None:
+    try:
+        return json.loads((pathlib.Path(job_dir) / "state.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+def _process_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (OSError, TypeError):
+        return True         # exists but not ours (EPERM), or no pid recorded: cannot tell
+    return True
+
+class _Progress:
+    """Worker-side state updates, written at most once per HEARTBEAT seconds."""
+
+    def __init__(self, job_dir: pathlib.Path, state: dict):
+        self.job_dir, self.state, self.written = job_dir, state, 0.0
+
+    def update(self, force: bool = False, **changes):
+        self.state.update(changes)
+        now = time.time()
+        if force or now - self.written >= HEARTBEAT:
+            self.state["updated_at"] = self.written = now
+            _write_state(self.job_dir, self.state)
+
+def run_job(job_dir):
+    """Worker process: score the input, then write the cohort PDF, reporting progress in state.json."""
+    from utils.pipeline import ChunkWriter, iter_response_chunks, score_chunk
+    from utils.cohort_report import cohort_report
+    job_dir = pathlib.Path(job_dir)
+    state = read_state(job_dir)
+    progress = _Progress(job_dir, state)
+    source = job_dir / state["input"]
+    q, family_column = state["questionnaire"], state["family_column"]
+    try:
+        progress.update(True, status="running", phase="scoring", done=0, total=None, error=None)
+        n = 0
+        with ChunkWriter(job_dir / OUTPUTS["scores"]) as w, ChunkWriter(job_dir / OUTPUTS["facets"]) as fw:
+            for ids, answers in iter_response_chunks(source, q):
+                wide, long = score_chunk(q, ids, answers)
+                w.write(wide); fw.write(long)
+                n += len(ids)
+                progress.update(done=n)
+        progress.update(True, phase="report", done=0, total=n, families=0)
+        done = families = 0
+        for _, members in cohort_report(source, q, job_dir / OUTPUTS["report"], family_column, source_name=state["name"]):
+            done += members; families += 1
+            progress.update(done=done, families=families)
+        progress.update(True, status="done", phase=None, done=n, families=families, finished_at=time.time())
+    except Exception as e:
+        progress.update(True, status="failed", error=f"{type(e).__name__}: {e}")
+
+class JobQueue:
+    def __init__(self, root, workers: int = 2):
+        self.root = pathlib.Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self._pool = None
+        self._futures = {}      # job id -> future, for jobs this process has queued
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is not None and getattr(self._pool, "_broken", False):
+            self._drop_pool()           # a worker died (e.g. killed for memory): the pool takes no more work
+        if self._pool is None:
+            self._pool = spawn_pool(self.workers)
+        return self._pool
+
+    def _drop_pool(self):
+        pool, self._pool = self._pool, None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, job_dir):
+        try:
+            return self._get_pool().submit(run_job, str(job_dir))
+        except BrokenProcessPool:       # broke since the check above: one fresh pool
+            self._drop_pool()
+            return self._get_pool().submit(run_job, str(job_dir))
+
+    def path(self, jid: str) -> pathlib.Path | None:
+        """The job directory for a well-formed id (None otherwise, so ?job= cannot escape the root)."""
+        if len(jid) != JOB_ID_LENGTH or any(ch not in "0123456789abcdef" for ch in jid):
+            return None
+        return self.root / jid
+
+    def state(self, jid: str) -> dict | None:
+        job_dir = self.path(jid)
+        return read_state(job_dir) if job_dir is not None else None
+
+    def output(self, jid: str, kind: str) -> pathlib.Path:
+        return self.path(jid) / OUTPUTS[kind]
+
+    def stale(self, state: dict) -> bool:
+        """True for a lost job: running without a heartbeat for STALE_AFTER seconds, or queued
+        by a server process that is gone (or whose pool dropped it). Waiting in line is not lost."""
+        if state["status"] == "running":
+            return time.time() - state.get("updated_at", 0) > STALE_AFTER
+        if state["status"] != "queued":
+            return False
+        host, pid = state.get("owner") or (None, None)
+        if host != socket.gethostname():
+            return False                # queued on another machine sharing the directory: cannot tell
+        if pid != os.getpid():
+            return not _process_alive(pid)
+        future = self._futures.get(state.get("id"))
+        return future is None or (future.done() and (future.cancelled() or future.exception() is not None))
+
+    def submit(self, questionnaire: str, name: str, data: bytes, family_column: str = "family_id") -> tuple[str, bool]:
+        """Queue a file; returns (job id, created). A file already queued, running or
+        done is not processed again; a failed or lost job is run again."""
+        jid = job_id(questionnaire, data, family_column)
+        job_dir = self.root / jid
+        with self._lock:
+            pending = self._futures.get(jid)
+            if pending is not None and not pending.done():
+                return jid, False
+            try:
+                job_dir.mkdir()             # atomic claim, also across processes sharing the directory
+                created = True
+            except FileExistsError:
+                # no state yet: just claimed, and lost if it stays that way past STALE_AFTER
+                state = read_state(job_dir) or {"status": "running", "updated_at": job_dir.stat().st_mtime}
+                if state["status"] != "failed" and not self.stale(state):
+                    return jid, False
+                created = False
+            suffix = pathlib.Path(name).suffix.lower()
+            if not (job_dir / f"input{suffix}").exists():
+                (job_dir / f"input{suffix}").write_bytes(data)
+            state = {
+                "id": jid, "questionnaire": questionnaire, "name": name, "input": f"input{suffix}",
+                "family_column": family_column, "size": len(data), "status": "queued",
+                "owner": [socket.gethostname(), os.getpid()],
+                "created_at": time.time(), "updated_at": time.time(),
+            }
+            _write_state(job_dir, state)
+            try:
+                self._futures[jid] = self._start(job_dir)
+            except Exception as e:      # no worker could take it: shown as failed, resubmitting retries
+                self._futures.pop(jid, None)
+                _write_state(job_dir, {**state, "status": "failed", "error": f"{type(e).__name__}: {e}", "updated_at": time.time()})
+        return jid, created
+
+    def recent(self, limit: int = 10) -> list:
+        """States of the most recently updated jobs, newest first."""
+        states = [s for s in (read_state(d) for d in self.root.iterdir() if d.is_dir()) if s]
+        return sorted(states, key=lambda s: s.get("updated_at", 0), reverse=True)[:limit]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_queue() -> JobQueue:
+    """The process-wide job queue."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(os.environ.get("IMPACT_JOBS_DIR", ".jobs"),
+                              workers=int(os.environ.get("IMPACT_JOB_WORKERS", "2")))
+            atexit.register(_queue.close)
+        return _queue
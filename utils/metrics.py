@@ -0,0 +1,136 @@
+"""In-process latency metrics for the submit path.
+
+    with timed("scoring"):
+        ...
+
+Every timed stage lands in a ring buffer of recent samples (for the admin
+panel) and in a cumulative histogram per stage. `prometheus_text()` renders
+all of it in the Prometheus text exposition format. Export is opt-in:
+
+    IMPACT_METRICS_FILE=/var/lib/node_exporter/impact.prom   rewritten every IMPACT_METRICS_INTERVAL s (default 15)
+    IMPACT_METRICS_PORT=9108                                 GET /metrics on a background HTTP server
+                                                             (bound to IMPACT_METRICS_HOST, default 127.0.0.1)
+
+Stdlib only; recording a sample is a lock plus a few list updates.
+"""
+import bisect, contextlib, os, pathlib, tempfile, threading, time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT = 500
+
+class Metrics:
+    def __init__(self, recent: int = RECENT):
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=recent)      # (timestamp, stage, seconds, ok)
+        self.buckets = {}                       # stage -> per-bucket counts (+Inf last)
+        self.sums = {}
+        self.errors = {}
+        self.counters = {}
+
+    def observe(self, stage: str, seconds: float, ok: bool = True):
+        with self._lock:
+            self.recent.append((time.time(), stage, seconds, ok))
+            counts = self.buckets.get(stage)
+            if counts is None:
+                counts = self.buckets[stage] = [0] * (len(BUCKETS) + 1)
+                self.sums[stage] = 0.0
+                self.errors[stage] = 0
+            counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            self.sums[stage] += seconds
+            if not ok:
+                self.errors[stage] += 1
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextlib.contextmanager
+    def timed(self, stage: str):
+        t0, ok = time.perf_counter(), False
+        try:
+            yield
+            ok = True
+        finally:
+            self.observe(stage, time.perf_counter() - t0, ok)
+
+    def snapshot(self, last: int | None = None):
+        """Recent samples, newest first."""
+        with self._lock:
+            items = list(self.recent)
+        return items[::-1][:last]
+
+    def prometheus_text(self) -> str:
+        with self._lock:
+            buckets = {s: list(c) for s, c in self.buckets.items()}
+            sums, errors, counters = dict(self.sums), dict(self.errors), dict(self.counters)
+        lines = ["# HELP impact_stage_seconds Latency of one submit/report stage.",
+                 "# TYPE impact_stage_seconds histogram"]
+        for stage in sorted(buckets):
+            total = 0
+            for le, n in zip([*map(repr, BUCKETS), "+Inf"], buckets[stage]):
+                total += n
+                lines.append(f'impact_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {total}')
+            lines.append(f'impact_stage_seconds_sum{{stage="{stage}"}} {sums[stage]:.6f}')
+            lines.append(f'impact_stage_seconds_count{{stage="{stage}"}} {total}')
+        lines += ["# HELP impact_stage_errors_total Stage runs that raised.",
+                  "# TYPE impact_stage_errors_total counter"]
+        lines += [f'impact_stage_errors_total{{stage="{s}"}} {errors[s]}' for s in sorted(errors)]
+        for name in sorted(counters):
+            lines += [f"# TYPE impact_{name}_total counter", f"impact_{name}_total {counters[name]}"]
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+timed = metrics.timed
+incr = metrics.incr
+
+def write_textfile(path):
+    """Atomically (re)write the exposition text, e.g. for node_exporter's textfile collector."""
+    target = pathlib.Path(path)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(metrics.prometheus_text())
+    os.replace(tmp, target)
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404); return
+        body = metrics.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+_started = False
+_start_lock = threading.Lock()
+
+def start_exporters():
+    """Start the file writer / HTTP endpoint configured by env vars (once per process)."""
+    global _started
+    with _start_lock:
+        if _started:
+            return
+        _started = True
+        path, port = os.environ.get("IMPACT_METRICS_FILE"), os.environ.get("IMPACT_METRICS_PORT")
+        if path:
+            interval = float(os.environ.get("IMPACT_METRICS_INTERVAL", "15"))
+            def loop():
+                while True:
+                    try:
+                        write_textfile(path)
+                    except OSError:
+                        pass
+                    time.sleep(interval)
+            threading.Thread(target=loop, name="metrics-textfile", daemon=True).start()
+        if port:
+            try:
+                server = ThreadingHTTPServer((os.environ.get("IMPACT_METRICS_HOST", "127.0.0.1"), int(port)), _Handler)
+            except OSError:   # another process (e.g. a second replica on this host) already serves it
+                return
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
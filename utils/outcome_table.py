@@ -0,0 +1,127 @@
+"""Precomputed outcomes over the bounded facet-sum space.
+
+Every facet sum is a small integer (cnt..5*cnt), so a questionnaire's whole
+outcome space fits in a table: 13^4 rows for family impact, 17^4 for legacy
+readiness. Each row holds the tier per facet, risk values, the summary text
+id and the advice rule-hit bits for one facet-sum tuple, so scoring becomes a
+single array index.
+
+Enabled by IMPACT_OUTCOME_TABLE_DIR: the table is built once, saved there as
+.npy files and memory-mapped read-only by every process afterwards.
+Build ahead of time with `python -m utils.outcome_table DIR`.
+"""
+import hashlib, json, os, pathlib, shutil, sys, tempfile, threading
+from dataclasses import dataclass
+from typing import Dict, Tuple
+import numpy as np
+from utils.questionnaires import REGISTRY, Questionnaire, get_questionnaire
+from utils.advice import RULE_SETS, advice_text, evaluate
+
+TABLE_VERSION = 1
+ARRAYS = ("tiers", "risk", "summary_id", "advice_mask")
+
+@dataclass(frozen=True, eq=False)
+class OutcomeTable:
+    questionnaire: Questionnaire
+    strides: np.ndarray          # (facets,) mixed-radix strides over (sum - cnt)
+    tiers: np.ndarray            # (rows, facets) int8
+    risk: np.ndarray             # (rows, facets) float64
+    summary_id: np.ndarray       # (rows,) int32 into `summaries`
+    advice_mask: np.ndarray      # (rows,) rule-hit bits, indexes `advice`
+    summaries: Tuple[str, ...]
+    advice: Tuple[str, ...]
+
+    def index(self, sums) -> np.ndarray | None:
+        """Row index for each (respondents x facets) facet-sum tuple, or None when any
+        tuple is outside the table (answers outside 1-5); callers then score directly."""
+        q = self.questionnaire
+        off = np.asarray(sums, dtype=np.int64).reshape(-1, len(q.facets)) - q.facet_counts
+        if (off < 0).any() or (off > q.max_scores - q.facet_counts).any():
+            return None
+        return off @ self.strides
+
+    def summary(self, sums):
+        rows = self.index(sums)
+        return None if rows is None else [self.summaries[i] for i in self.summary_id[rows]]
+
+    def advice_for(self, sums):
+        rows = self.index(sums)
+        return None if rows is None else [self.advice[m] for m in self.advice_mask[rows]]
+
+def _fingerprint(q: Questionnaire) -> str:
+    rules = RULE_SETS[q.key]
+    payload = [TABLE_VERSION, q.questions, q.thresholds, rules.metric, rules.facets, rules.texts,
+               rules.thresholds.tolist(), rules.less_than.tolist(), rules.fallback, rules.footer]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+def _strides(q: Questionnaire) -> np.ndarray:
+    radix = q.max_scores - q.facet_counts + 1
+    return np.concatenate([np.cumprod(radix[::-1])[::-1][1:], [1]]).astype(np.int64)
+
+def build_table(questionnaire) -> OutcomeTable:
+    from utils.scoring import facet_tiers, summary_ids
+    q = get_questionnaire(questionnaire)
+    rules = RULE_SETS[q.key]
+    radix = q.max_scores - q.facet_counts + 1
+    sums = np.indices(radix).reshape(len(radix), -1).T + q.facet_counts
+    avg = sums / q.facet_counts
+    metrics = {"facets": list(q.facets), "sum": sums, "avg": avg, "risk": np.round(5 - avg, 2)}
+    tiers = facet_tiers(q, metrics)
+
+    hits = evaluate(rules, metrics[rules.metric])
+    advice_mask = (hits.astype(np.int64) << np.arange(hits.shape[1])).sum(axis=1).astype(np.uint16)
+    advice = tuple(advice_text(rules, [(m >> b) & 1 for b in range(hits.shape[1])]) for m in range(1 << hits.shape[1]))
+
+    summaries, summary_id = summary_ids(q, metrics)
+    return OutcomeTable(q, _strides(q), tiers, metrics["risk"], summary_id, advice_mask, tuple(summaries), advice)
+
+def save_table(table: OutcomeTable, directory) -> pathlib.Path:
+    q = table.questionnaire
+    target = pathlib.Path(directory) / f"{q.key}-{_fingerprint(q)}"
+    if target.exists():
+        return target
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = pathlib.Path(tempfile.mkdtemp(dir=target.parent, prefix=f".{q.key}-"))
+    try:
+        for name in ARRAYS:
+            np.save(tmp / f"{name}.npy", getattr(table, name))
+        (tmp / "meta.json").write_text(json.dumps({"summaries": table.summaries, "advice": table.advice},
+                                                  ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, target)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not target.exists():
+            raise
+    return target
+
+def load_table(questionnaire, directory) -> OutcomeTable | None:
+    q = get_questionnaire(questionnaire)
+    path = pathlib.Path(directory) / f"{q.key}-{_fingerprint(q)}"
+    if not path.exists():
+        return None
+    meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in ARRAYS}
+    return OutcomeTable(q, _strides(q), summaries=tuple(meta["summaries"]), advice=tuple(meta["advice"]), **arrays)
+
+_tables: Dict[str, OutcomeTable] = {}
+_lock = threading.Lock()
+
+def outcome_table(questionnaire) -> OutcomeTable | None:
+    """The memory-mapped table for a registered questionnaire, or None when disabled."""
+    directory = os.environ.get("IMPACT_OUTCOME_TABLE_DIR")
+    q = get_questionnaire(questionnaire)
+    if not directory or REGISTRY.get(q.key) is not q:
+        return None
+    with _lock:
+        if q.key not in _tables:
+            table = load_table(q, directory)
+            if table is None:
+                save_table(build_table(q), directory)
+                table = load_table(q, directory)
+            _tables[q.key] = table
+        return _tables[q.key]
+
+if __name__ == "__main__":
+    out = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("IMPACT_OUTCOME_TABLE_DIR", ".outcome_tables")
+    for q in REGISTRY.values():
+        print(save_table(build_table(q), out))
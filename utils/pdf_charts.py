@@ -0,0 +1,83 @@
+"""Vector (reportlab.graphics) versions of the radar and heatmap charts.
+
+These mirror `utils.charts.radar_plot` / `heatmap_from_dict` closely enough
+for reports, but go into the PDF as paths and text instead of a rasterized
+PNG, so the file stays small and prints sharp.
+"""
+import math
+from reportlab.graphics.shapes import Drawing, Circle, Line, Polygon, PolyLine, Rect, String
+from reportlab.lib.colors import Color, HexColor
+
+LINE = HexColor("#1f77b4")
+GRID = HexColor("#b0b0b0")
+TEXT = HexColor("#222222")
+VIRIDIS = [(0.0, "#440154"), (0.25, "#3b528b"), (0.5, "#21918c"), (0.75, "#5ec962"), (1.0, "#fde725")]
+
+def _viridis(t: float) -> Color:
+    t = min(1.0, max(0.0, t))
+    for (t0, c0), (t1, c1) in zip(VIRIDIS, VIRIDIS[1:]):
+        if t <= t1:
+            a, b, f = HexColor(c0), HexColor(c1), (t - t0) / (t1 - t0)
+            return Color(a.red + (b.red - a.red) * f, a.green + (b.green - a.green) * f, a.blue + (b.blue - a.blue) * f)
+    return HexColor(VIRIDIS[-1][1])
+
+def radar_drawing(scores: dict, font_name: str, size: float = 420, grid: bool = True, values: bool = True,
+                  members=()) -> Drawing:
+    """Radar of facet averages, optionally with thin per-member lines (`members`:
+    rows of facet averages). The grid (rings, spokes, labels) depends only on
+    the facets, so a multi-section document can draw it once as a shared form
+    (`grid=False` / `values=False` give the two layers separately)."""
+    labels = list(scores.keys())
+    avgs = [scores[k]["avg"] for k in labels]
+    d = Drawing(size, size)
+    cx = cy = size / 2
+    radius = size / 2 - 60
+
+    if grid:
+        for r in range(1, 6):
+            d.add(Circle(cx, cy, radius * r / 5, strokeColor=GRID, strokeWidth=0.5, fillColor=None))
+            d.add(String(cx + 3, cy + radius * r / 5 + 2, str(r), fontName=font_name, fontSize=8, fillColor=GRID))
+
+    # Same orientation as the matplotlib chart: first facet at 12 o'clock, clockwise.
+    angles = [math.pi / 2 - 2 * math.pi * i / max(1, len(labels)) for i in range(len(labels))]
+    points = []
+    for label, a, v in zip(labels, angles, avgs):
+        if grid:
+            ex, ey = cx + radius * math.cos(a), cy + radius * math.sin(a)
+            d.add(Line(cx, cy, ex, ey, strokeColor=GRID, strokeWidth=0.5))
+            anchor = "middle" if abs(math.cos(a)) < 0.3 else ("start" if math.cos(a) > 0 else "end")
+            d.add(String(cx + (radius + 14) * math.cos(a), cy + (radius + 14) * math.sin(a) - 4, label,
+                         fontName=font_name, fontSize=11, fillColor=TEXT, textAnchor=anchor))
+        r = radius * max(0.0, min(v, 5)) / 5
+        points += [cx + r * math.cos(a), cy + r * math.sin(a)]
+
+    if values:
+        for row in members:
+            rs = [radius * max(0.0, min(float(v), 5)) / 5 for v in row]
+            line = [c for a, r in zip(angles, rs) for c in (cx + r * math.cos(a), cy + r * math.sin(a))]
+            d.add(PolyLine(line + line[:2], strokeColor=GRID, strokeWidth=0.75))
+    if points and values:
+        d.add(Polygon(points, fillColor=LINE, fillOpacity=0.1, strokeColor=None))
+        d.add(PolyLine(points + points[:2], strokeColor=LINE, strokeWidth=2))
+    return d
+
+def heatmap_drawing(risk_dict: dict, font_name: str, width: float = 480) -> Drawing:
+    labels = list(risk_dict.keys())
+    values = [float(risk_dict[k]) for k in labels]
+    height = 150
+    d = Drawing(width, height)
+    d.add(String(width / 2, height - 16, "風險熱力圖｜0 = 低風險；數值越高風險越高",
+                 fontName=font_name, fontSize=11, fillColor=TEXT, textAnchor="middle"))
+    if not values:
+        return d
+
+    lo, hi = min(values), max(values)
+    cell_w, top, cell_h = width / len(values), height - 30, 80
+    for j, (label, v) in enumerate(zip(labels, values)):
+        x, t = j * cell_w, (v - lo) / (hi - lo) if hi > lo else 0.0
+        d.add(Rect(x, top - cell_h, cell_w, cell_h, fillColor=_viridis(t), strokeColor=None))
+        d.add(String(x + cell_w / 2, top - cell_h / 2 - 4, f"{v:.1f}", fontName=font_name, fontSize=11,
+                     fillColor=TEXT if t >= 0.5 else HexColor("#ffffff"), textAnchor="middle"))
+        d.add(String(x + cell_w / 2, top - cell_h - 16, label, fontName=font_name, fontSize=10,
+                     fillColor=TEXT, textAnchor="middle"))
+    return d
@@ -1,21 +1,16 @@
 
-import os, io, pathlib, urllib.request
+import os, io
+from functools import lru_cache
 from datetime import datetime
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.utils import ImageReader, simpleSplit
 from reportlab.lib.colors import HexColor
-
-CANDIDATE_NAMES = [
-    "NotoSansTC-Regular.ttf",
-    "NotoSansCJKtc-Regular.ttf",
-]
-DOWNLOAD_URLS = [
-    "https://github.com/googlefonts/noto-cjk/raw/main/Sans/TTF/TraditionalChinese/NotoSansTC-Regular.ttf",
-    "https://github.com/googlefonts/noto-cjk/raw/main/Sans/TTF/TraditionalChinese/NotoSansCJKtc-Regular.ttf",
-]
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.graphics import renderPDF
+from reportlab.graphics.shapes import Drawing
+from utils.fonts import pdf_font_name
+from utils.metrics import timed
 
 LOGO_CANDIDATES = ["logo.png","./logo.png","assets/logo.png"]
 
@@ -25,118 +20,193 @@ def _choose(path_list):
             return p
     return None
 
-def _find_or_fetch_font() -> str | None:
-    here = pathlib.Path(__file__).resolve()
-    roots = [here.parent, here.parent.parent, pathlib.Path.cwd()]
-    for r in roots:
-        for name in CANDIDATE_NAMES:
-            p = r / name
-            if p.exists():
-                return str(p)
-
-    cache_dir = pathlib.Path(".fonts")
-    cache_dir.mkdir(exist_ok=True)
-    for url in DOWNLOAD_URLS:
+@lru_cache(maxsize=1)
+def _logo_image():
+    """Decode the brand logo once per process (None when absent or unreadable)."""
+    logo = _choose(LOGO_CANDIDATES)
+    if logo:
         try:
-            target = cache_dir / url.split("/")[-1]
-            if not target.exists():
-                urllib.request.urlretrieve(url, target)
-            if target.exists():
-                return str(target)
+            return ImageReader(logo)
         except Exception:
-            continue
+            pass
     return None
 
-def _font_name():
-    fp = _find_or_fetch_font()
-    if fp and os.path.exists(fp):
-        try:
-            pdfmetrics.registerFont(TTFont("NotoSansTC", fp))
-            return "NotoSansTC"
-        except Exception:
-            pass
-    return "Helvetica"
+HEADER_FOOTER_FORM = "impactHeaderFooter"
 
-def _paint_header_footer(c, font_name, footer_text):
+def _define_header_footer(c, font_name, footer_text):
+    """Record the brand bar, logo and footer once as a form XObject for this document."""
     width, height = A4
+    c.beginForm(HEADER_FOOTER_FORM); c.saveState()
     brand = HexColor("#0f766e")
     c.setFillColor(brand); c.rect(0, height-70, width, 70, fill=1, stroke=0)
-    logo = _choose(LOGO_CANDIDATES)
+    logo = _logo_image()
     if logo:
         try:
-            c.drawImage(ImageReader(logo), 35, height-62, width=120, height=48, mask='auto')
+            c.drawImage(logo, 35, height-62, width=120, height=48, mask='auto')
         except Exception:
             pass
     c.setFont(font_name, 13); c.setFillColor(HexColor("#ffffff"))
     c.drawRightString(width-35, height-42, "影響力傳承平台｜永傳家族辦公室")
     c.setFont(font_name, 9); c.setFillColor(HexColor("#666666"))
     c.drawRightString(width-35, 22, footer_text)
+    c.restoreState(); c.endForm()
 
-def build_report(title, subtitle, summary_text, advisor_actions, tables, images,
-                 footer_text="永傳家族辦公室  gracefo.com"):
-    font_name = _font_name()
-    buf = io.BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    width, height = A4
+def _paint_header_footer(c):
+    c.doForm(HEADER_FOOTER_FORM)
+
+def _cells(values) -> list:
+    values = values.tolist() if hasattr(values, "tolist") else list(values)
+    return [str(v) for v in values]
+
+def table_columns(table) -> list:
+    """(header, cell strings) per column from a DataFrame or a {header: values} mapping of column arrays."""
+    if hasattr(table, "columns"):
+        return [(str(col), _cells(table[col])) for col in table.columns]
+    return [(str(col), _cells(values)) for col, values in table.items()]
+
+class ReportWriter:
+    """A PDF laid out top to bottom, section by section, onto one canvas.
+
+    `out` is a file path or binary file object; nothing is returned until
+    `close()` writes the document. Everything a document repeats is stored
+    once: the header/footer (with the logo image) is a form XObject, the CJK
+    font is registered once and subset once, and `shared_form` records any
+    other repeated drawing (e.g. a radar grid) for reuse on every page.
+    """
+    top, bottom, left = A4[1] - 110, 90, 40
 
-    _paint_header_footer(c, font_name, footer_text)
-    c.setFillColor(HexColor("#111111")); c.setFont(font_name, 20)
-    c.drawString(40, height-110, title or "")
-    c.setFont(font_name, 13); c.drawString(40, height-132, subtitle or "")
-    c.setFont(font_name, 11); c.setFillColor(HexColor("#444444"))
-    c.drawString(40, height-154, datetime.now().strftime("%Y-%m-%d"))
-    c.setFillColor(HexColor("#222222")); c.setFont(font_name, 11)
-    t = c.beginText(40, height-185); t.textLines(summary_text or "（無）"); c.drawText(t)
-    c.showPage()
-
-    if images:
-        for ttitle, png in images:
-            _paint_header_footer(c, font_name, footer_text)
-            c.setFillColor(HexColor("#111111")); c.setFont(font_name, 13)
-            c.drawString(40, height-110, ttitle or "圖表")
-            try:
-                img_r = ImageReader(io.BytesIO(png))
-                max_w, max_h = width-80, height-200
+    def __init__(self, out, footer_text="永傳家族辦公室  gracefo.com"):
+        self.font = pdf_font_name()
+        self.c = canvas.Canvas(os.fspath(out) if isinstance(out, os.PathLike) else out, pagesize=A4, pageCompression=1)
+        self.width, self.height = A4
+        self.y = None
+        self._forms = set()
+        _define_header_footer(self.c, self.font, footer_text)
+
+    def new_page(self):
+        if self.y is not None:
+            self.c.showPage()
+        _paint_header_footer(self.c)
+        self.y = self.top
+
+    def ensure(self, space):
+        """Start a new page unless `space` points fit above the bottom margin."""
+        if self.y is None or self.y - space < self.bottom:
+            self.new_page()
+
+    def cover(self, title, subtitle, summary_text, date=None):
+        self.new_page()
+        c, y = self.c, self.top
+        c.setFillColor(HexColor("#111111")); c.setFont(self.font, 20); c.drawString(self.left, y, title or "")
+        c.setFont(self.font, 13); c.drawString(self.left, y-22, subtitle or "")
+        c.setFont(self.font, 11); c.setFillColor(HexColor("#444444"))
+        c.drawString(self.left, y-44, date or datetime.now().strftime("%Y-%m-%d"))
+        c.setFillColor(HexColor("#222222"))
+        t = c.beginText(self.left, y-75); t.textLines(summary_text or "（無）"); c.drawText(t)
+        self.y = self.bottom   # the next section starts on a fresh page
+
+    def heading(self, text, size=13, space=18):
+        self.ensure(space + 14)
+        self.c.setFillColor(HexColor("#111111")); self.c.setFont(self.font, size)
+        self.c.drawString(self.left, self.y, text or ""); self.y -= space
+
+    def shared_form(self, name, drawing):
+        """Record `drawing` as a form XObject the first time `name` is used in this document."""
+        if name not in self._forms:
+            self.c.beginForm(name, 0, 0, drawing.width, drawing.height)
+            renderPDF.draw(drawing, self.c, 0, 0)
+            self.c.endForm()
+            self._forms.add(name)
+
+    def chart(self, chart, height=None, form=None, max_scale=1.2):
+        """Place a chart centred in a box `height` points tall (default: the rest of the page).
+
+        `chart` is PNG bytes or a reportlab Drawing; `form` names a shared form
+        (see `shared_form`) drawn underneath it at the same scale."""
+        self.ensure(height or 200)
+        max_w, max_h = self.width - 2*self.left, (height or self.y - self.bottom + 20)
+        bottom = self.y - max_h
+        try:
+            if isinstance(chart, Drawing):
+                scale = min(max_w/chart.width, max_h/chart.height, max_scale)
+                w, h = chart.width*scale, chart.height*scale
+                self.c.saveState(); self.c.translate(self.left+(max_w-w)/2, bottom+(max_h-h)/2); self.c.scale(scale, scale)
+                if form:
+                    self.c.doForm(form)
+                renderPDF.draw(chart, self.c, 0, 0); self.c.restoreState()
+            else:
+                img_r = ImageReader(io.BytesIO(chart))
                 iw, ih = img_r.getSize()
                 scale = min(max_w/iw, max_h/ih)
                 w, h = iw*scale, ih*scale
-                c.drawImage(img_r, 40+(max_w-w)/2, 80+(max_h-h)/2, width=w, height=h, mask='auto')
-            except Exception:
-                pass
-            c.showPage()
-
-    _paint_header_footer(c, font_name, footer_text)
-    y = height-110
-    c.setFillColor(HexColor("#111111"))
-    if tables:
-        for ttitle, df in tables:
-            c.setFont(font_name, 13); c.drawString(40, y, ttitle or "分數摘要"); y -= 18
-            c.setFont(font_name, 10)
-            if hasattr(df, "columns"):
-                x = 40
-                for col in df.columns:
-                    c.drawString(x, y, str(col)); x += 140
-                y -= 14
-                if hasattr(df, "iterrows"):
-                    for _, row in df.iterrows():
-                        x = 40
-                        for col in df.columns:
-                            c.drawString(x, y, str(row[col])); x += 140
-                        y -= 14
-                        if y < 90:
-                            c.showPage(); _paint_header_footer(c, font_name, footer_text); y = height-110
-                            c.setFont(font_name, 10)
-            y -= 10
+                self.c.drawImage(img_r, self.left+(max_w-w)/2, bottom+(max_h-h)/2, width=w, height=h, mask='auto')
+        except Exception:
+            pass
+        self.y = bottom - 10
+
+    def table(self, title, table, size=10, leading=14):
+        """Lay a table out column by column: one text object per column per page."""
+        columns = table_columns(table)
+        if title:
+            self.heading(title)
+        if not columns:
+            return
+        avail = self.width - 2*self.left
+        widths = [max(stringWidth(h, self.font, size), *(stringWidth(v, self.font, size) for v in cells)) + 12
+                  for h, cells in columns]
+        fit = min(1.0, avail / sum(widths))
+        widths = [w * fit for w in widths]
+        nrows = max(len(cells) for _, cells in columns)
+        start = 0
+        while True:
+            self.ensure(2 * leading)
+            rows = min(nrows - start, int((self.y - self.bottom) // leading) - 1)
+            x = self.left
+            for (header, cells), w in zip(columns, widths):
+                t = self.c.beginText(x, self.y); t.setFont(self.font, size); t.setLeading(leading)
+                t.textLines([header] + cells[start:start + rows]); self.c.drawText(t)
+                x += w
+            self.y -= leading * (rows + 1)
+            start += rows
+            if start >= nrows:
+                break
+            self.new_page()
+        self.y -= 10
+
+    def text(self, heading, body, size=10, leading=13, indent=8):
+        width = self.width - 2*self.left - indent
+        lines = [part for line in (body or "").splitlines() for part in (simpleSplit(line, self.font, size, width) or [""])]
+        if heading:
+            self.ensure(16 + 3 * leading)
+            self.c.setFillColor(HexColor("#111111")); self.c.setFont(self.font, size + 2)
+            self.c.drawString(self.left, self.y, heading); self.y -= 16
+        while lines:
+            self.ensure(2 * leading)
+            n = max(1, int((self.y - self.bottom) // leading))
+            t = self.c.beginText(self.left + indent, self.y); t.setFont(self.font, size); t.setLeading(leading)
+            t.textLines(lines[:n]); self.c.drawText(t)
+            self.y -= leading * len(lines[:n]); lines = lines[n:]
+        self.y -= 6
 
+    def close(self):
+        if self.y is not None:
+            self.c.showPage()
+        self.c.save()
+
+@timed("pdf_build")
+def build_report(title, subtitle, summary_text, advisor_actions, tables, images,
+                 footer_text="永傳家族辦公室  gracefo.com"):
+    """Build the report PDF. `images` holds (title, chart) pairs where chart is
+    PNG bytes or a reportlab Drawing (embedded as vector graphics)."""
+    buf = io.BytesIO()
+    w = ReportWriter(buf, footer_text)
+    w.cover(title, subtitle, summary_text)
+    for ttitle, chart in images or []:
+        w.new_page(); w.heading(ttitle or "圖表", space=0); w.chart(chart, height=w.height-200)
+    w.new_page()
+    for ttitle, df in tables or []:
+        w.table(ttitle or "分數摘要", df)
     if advisor_actions:
-        if y < 140: c.showPage(); _paint_header_footer(c, font_name, footer_text); y = height-110
-        c.setFont(font_name, 12); c.drawString(40, y, "顧問下一步建議"); y -= 16
-        c.setFont(font_name, 10)
-        for line in advisor_actions.splitlines():
-            c.drawString(48, y, line); y -= 13
-            if y < 90:
-                c.showPage(); _paint_header_footer(c, font_name, footer_text); y = height-110
-                c.setFont(font_name, 10)
-
-    c.showPage(); c.save()
+        w.text("顧問下一步建議", advisor_actions)
+    w.close()
     return buf.getvalue()
@@ -0,0 +1,207 @@
+"""Streaming import -> score -> export for large response files.
+
+    python -m utils.pipeline responses.parquet -q legacy_readiness -o scores.parquet --facets-out facets.csv
+
+Inputs (CSV, Excel, Parquet) are read in fixed-size chunks and every chunk
+is scored with `utils.scoring.score_matrix`, then appended to the outputs
+(CSV or Parquet). Memory stays bounded by the chunk size, not the file size
+(except for legacy .xls, which is read whole).
+Answer columns are Q1..Qn in questionnaire order; an optional id column
+(default `respondent_id`) is carried through.
+"""
+import argparse, contextlib, pathlib, sys
+import numpy as np
+import pandas as pd
+from utils.questionnaires import REGISTRY, get_questionnaire
+from utils.scoring import batch_outcomes, score_matrix
+
+DEFAULT_CHUNKSIZE = 50_000
+ANSWER_VALUES = np.arange(1, 6)
+
+def answer_columns(questionnaire) -> list:
+    return [f"Q{i}" for i in range(1, len(get_questionnaire(questionnaire).questions) + 1)]
+
+def _check_columns(found, cols):
+    missing = [c for c in cols if c not in found]
+    if missing:
+        raise ValueError(f"missing answer columns: {', '.join(missing)}")
+
+def _csv_chunks(path, cols, id_column, chunksize):
+    header = pd.read_csv(path, nrows=0).columns
+    if hasattr(path, "seek"):
+        path.seek(0)
+    _check_columns(header, cols)
+    usecols = cols + ([id_column] if id_column in header else [])
+    yield from pd.read_csv(path, usecols=usecols, chunksize=chunksize, dtype={id_column: str})
+
+def _parquet_chunks(path, cols, id_column, chunksize):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet input needs pyarrow (pip install pyarrow)") from e
+    pf = pq.ParquetFile(path)
+    names = pf.schema_arrow.names
+    _check_columns(names, cols)
+    columns = cols + ([id_column] if id_column in names else [])
+    for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
+
+def _excel_chunks(path, cols, id_column, chunksize):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportError("Excel input needs openpyxl (pip install openpyxl)") from e
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(h) if h is not None else "" for h in next(rows, ())]
+        _check_columns(header, cols)
+        keep = cols + ([id_column] if id_column in header else [])
+        pos = [header.index(c) for c in keep]
+        buf = []
+        for row in rows:
+            buf.append([row[i] if i < len(row) else None for i in pos])
+            if len(buf) >= chunksize:
+                yield pd.DataFrame(buf, columns=keep); buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=keep)
+    finally:
+        wb.close()
+
+def _xls_chunks(path, cols, id_column, chunksize):
+    # legacy .xls has no streaming reader: the sheet is read whole, then handed out in chunks
+    try:
+        df = pd.read_excel(path, dtype={id_column: str})
+    except ImportError as e:
+        raise ImportError("Excel 97-2003 (.xls) input needs xlrd (pip install xlrd)") from e
+    df.columns = [str(c) for c in df.columns]
+    _check_columns(df.columns, cols)
+    df = df[cols + ([id_column] if id_column in df.columns else [])]
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+def _answer_matrix(df, cols, offset):
+    """The chunk's answers as int64; blank, non-numeric, fractional or out-of-range cells raise ValueError."""
+    values = df[cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    bad = ~np.isin(values, ANSWER_VALUES)
+    if bad.any():
+        r, c = np.argwhere(bad)[0]
+        cell = df[cols[c]].iloc[r]
+        raise ValueError(f"row {offset + r + 1}, column {cols[c]}: answers must be whole numbers 1-5"
+                         f" (got {'a blank cell' if pd.isna(cell) else repr(cell) if isinstance(cell, str) else cell})")
+    return values.astype(np.int64)
+
+READERS = {".csv": _csv_chunks, ".parquet": _parquet_chunks, ".pq": _parquet_chunks,
+           ".xlsx": _excel_chunks, ".xlsm": _excel_chunks, ".xls": _xls_chunks}
+
+def iter_response_chunks(path, questionnaire, id_column: str = "respondent_id", chunksize: int = DEFAULT_CHUNKSIZE):
+    """Yield (ids, answers) per chunk; answers is an int64 (rows x questions) matrix of 1-5.
+
+    `path` may also be a binary file object with a `.name` (e.g. a Streamlit upload).
+    """
+    suffix = pathlib.Path(getattr(path, "name", path)).suffix.lower()
+    if suffix not in READERS:
+        raise ValueError(f"unsupported input format: {suffix or path}")
+    cols = answer_columns(questionnaire)
+    offset = 0
+    for df in READERS[suffix](path, cols, id_column, chunksize):
+        if id_column in df.columns:
+            ids = df[id_column].astype(str).to_numpy()
+        else:
+            ids = np.arange(offset + 1, offset + len(df) + 1).astype(str)
+        answers = _answer_matrix(df, cols, offset)
+        offset += len(df)
+        yield ids, answers
+
+def read_responses(path, questionnaire, id_column: str = "respondent_id"):
+    """Whole (ids, answers) for small inputs such as one family's members."""
+    chunks = list(iter_response_chunks(path, questionnaire, id_column))
+    if not chunks:
+        return np.array([], dtype=str), np.empty((0, len(answer_columns(questionnaire))), dtype=np.int64)
+    return np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks])
+
+def score_chunk(questionnaire, ids, answers):
+    """Per-respondent (wide) and per-facet (long) result frames for one chunk."""
+    q = get_questionnaire(questionnaire)
+    batch = score_matrix(q, answers)
+    wide = {"respondent_id": ids}
+    for j, f in enumerate(batch["facets"]):
+        wide[f"{f}_sum"] = batch["sum"][:, j]
+        wide[f"{f}_avg"] = np.round(batch["avg"][:, j], 2)
+        if q.key == "legacy_readiness":
+            wide[f"{f}_risk"] = batch["risk"][:, j]
+    wide["summary"], wide["advice"] = batch_outcomes(q, batch)
+
+    n, k = batch["sum"].shape
+    long = pd.DataFrame({
+        "respondent_id": np.repeat(ids, k),
+        "facet": np.tile(np.array(batch["facets"], dtype=object), n),
+        "sum": batch["sum"].ravel(),
+        "avg": np.round(batch["avg"], 2).ravel(),
+        "risk": batch["risk"].ravel(),
+    })
+    return pd.DataFrame(wide), long
+
+class ChunkWriter:
+    """Append DataFrame chunks to a CSV (UTF-8 BOM, header once) or Parquet file."""
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.parquet = self.path.suffix.lower() in (".parquet", ".pq")
+        self._fh = self._pw = None
+
+    def write(self, df: pd.DataFrame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._pw is None:
+                self._pw = pq.ParquetWriter(self.path, table.schema)
+            self._pw.write_table(table)
+        else:
+            first = self._fh is None
+            if first:
+                self._fh = open(self.path, "w", encoding="utf-8-sig", newline="")
+            df.to_csv(self._fh, header=first, index=False)
+
+    def close(self):
+        if self._pw is not None:
+            self._pw.close()
+        if self._fh is not None:
+            self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def run_pipeline(path, questionnaire, out, facets_out=None, id_column: str = "respondent_id",
+                 chunksize: int = DEFAULT_CHUNKSIZE) -> int:
+    n = 0
+    with contextlib.ExitStack() as stack:
+        w = stack.enter_context(ChunkWriter(out))
+        fw = stack.enter_context(ChunkWriter(facets_out)) if facets_out else None
+        for ids, answers in iter_response_chunks(path, questionnaire, id_column, chunksize):
+            wide, long = score_chunk(questionnaire, ids, answers)
+            w.write(wide)
+            if fw is not None:
+                fw.write(long)
+            n += len(ids)
+    return n
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Stream a response export through scoring.")
+    ap.add_argument("responses", help="CSV, Excel (.xlsx/.xls) or Parquet file with Q1..Qn answer columns")
+    ap.add_argument("--questionnaire", "-q", choices=sorted(REGISTRY), required=True)
+    ap.add_argument("--out", "-o", required=True, help="per-respondent results (.csv or .parquet)")
+    ap.add_argument("--facets-out", help="optional per-facet long-format results (.csv or .parquet)")
+    ap.add_argument("--id-column", default="respondent_id")
+    ap.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = ap.parse_args(argv)
+    n = run_pipeline(args.responses, args.questionnaire, args.out, args.facets_out, args.id_column, args.chunksize)
+    print(f"done: {n} respondents scored -> {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+"""Process pools for work started from a running server (Streamlit, the ASGI service)."""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+def spawn_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn, not fork: the parent runs threads and an event loop, and a forked child
+    # inherits their locks in whatever state they were in
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
@@ -0,0 +1,100 @@
+"""Questionnaire registry.
+
+Each questionnaire is compiled once at import into the index arrays that
+scoring, the pages and the batch tools share: question -> facet index,
+facet order, per-facet question counts / max scores and tier thresholds.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+import numpy as np
+
+FAMILY_IMPACT_QUESTIONS = [
+    ("家族角色認同", "我清楚知道自己在家族中的責任與影響力。"),
+    ("家族角色認同", "我願意在需要時承擔家族的決策責任。"),
+    ("家族角色認同", "我能夠代表家族做出理性且負責任的決策。"),
+    ("財務參與度", "我了解家族資產的主要分布與結構。"),
+    ("財務參與度", "我參與過家族重大財務決策的討論。"),
+    ("財務參與度", "我知道家族資產未來的分配與管理計畫。"),
+    ("情感連結", "我們家族成員之間有開放且尊重的溝通。"),
+    ("情感連結", "家族成員之間能彼此支持，並共同面對挑戰。"),
+    ("情感連結", "我感受到家族成員之間的情感與信任連結很強。"),
+    ("傳承願景", "我們家族對下一代的願景是清晰一致的。"),
+    ("傳承願景", "我們已經討論過家族的長期目標與計劃。"),
+    ("傳承願景", "家族成員都同意需要一個明確的傳承與交棒方案。"),
+]
+
+LEGACY_READINESS_QUESTIONS = [
+    ("資產透明度", "我們有一份最新且完整的資產清單（含權屬、地區、幣別）。"),
+    ("資產透明度", "對境外/跨境資產的所有權與受益人關係清晰明確。"),
+    ("資產透明度", "主要資產均有相對應的文件與存證（契約、股權、信託、受益名冊）。"),
+    ("資產透明度", "資產清單有指定維護人，且至少每季更新一次。"),
+
+    ("稅務與合規", "我們清楚不同法域的稅務影響（遺產稅、贈與稅、所得稅、地價/房地合一等）。"),
+    ("稅務與合規", "已評估跨境申報要求（如 CRS、FBAR／FATCA 等）。"),
+    ("稅務與合規", "已建立年度合規檢核清單（報稅、申報、帳務保存等）。"),
+    ("稅務與合規", "遇到重大交易時，會事先諮詢稅務與法律專家意見。"),
+
+    ("接班計畫", "企業或資產已有明確接班人與權責分工。"),
+    ("接班計畫", "已擬定 3-5 年交棒時程與里程碑。"),
+    ("接班計畫", "有固定的家族/董事會會議節奏與決策紀錄機制。"),
+    ("接班計畫", "已規劃風險事件（失能/身故等）下的臨時接班機制。"),
+
+    ("保險與信託", "已有足額的人壽保險或年金，保障傳承所需現金流。"),
+    ("保險與信託", "適當運用信託/保單降低風險、避免爭產、保障特定對象。"),
+    ("保險與信託", "每 1-2 年檢視一次保單與信託結構的適配性與成本。"),
+    ("保險與信託", "對重大風險（長照、醫療、法稅）有對應的財務預備。"),
+]
+
+@dataclass(frozen=True, eq=False)
+class Questionnaire:
+    key: str
+    title: str
+    questions: Tuple[Tuple[str, str], ...]
+    facets: Tuple[str, ...]
+    facet_index: np.ndarray      # (questions,) facet position of each question
+    onehot: np.ndarray           # (questions, facets) 0/1 membership matrix
+    facet_counts: np.ndarray     # (facets,) questions per facet
+    max_scores: np.ndarray       # (facets,) highest reachable facet sum
+    groups: Tuple[Tuple[str, Tuple[Tuple[int, str], ...]], ...]  # (facet, ((1-based number, text), ...))
+    thresholds: Dict[str, float] = field(default_factory=dict)
+
+def compile_questionnaire(key: str, title: str, questions, thresholds=None, max_answer: int = 5) -> Questionnaire:
+    questions = tuple((f, t) for f, t in questions)
+    facets = tuple(dict.fromkeys(f for f, _ in questions))
+    position = {f: j for j, f in enumerate(facets)}
+    facet_index = np.array([position[f] for f, _ in questions], dtype=np.intp)
+    onehot = np.zeros((len(questions), len(facets)), dtype=np.int64)
+    onehot[np.arange(len(questions)), facet_index] = 1
+    counts = onehot.sum(axis=0)
+    for a in (facet_index, onehot, counts):
+        a.setflags(write=False)
+    max_scores = counts * max_answer
+    max_scores.setflags(write=False)
+    groups = tuple((f, tuple((i + 1, t) for i, (g, t) in enumerate(questions) if g == f)) for f in facets)
+    return Questionnaire(key, title, questions, facets, facet_index, onehot, counts, max_scores, groups,
+                         dict(thresholds or {}))
+
+FAMILY_IMPACT = compile_questionnaire(
+    "family_impact", "家族影響力指數", FAMILY_IMPACT_QUESTIONS,
+    thresholds={"strength": 4.0, "mid": 3.0},
+)
+LEGACY_READINESS = compile_questionnaire(
+    "legacy_readiness", "傳承準備度測驗", LEGACY_READINESS_QUESTIONS,
+    thresholds={"high_risk": 2.0, "mid_risk": 1.0},
+)
+
+REGISTRY = {q.key: q for q in (FAMILY_IMPACT, LEGACY_READINESS)}
+_BY_QUESTIONS = {q.questions: q for q in REGISTRY.values()}
+
+def get_questionnaire(questions) -> Questionnaire:
+    """Return the compiled questionnaire for a key, a question list or a Questionnaire.
+
+    Registered question lists resolve to their precompiled entry; any other
+    list is compiled on the fly.
+    """
+    if isinstance(questions, Questionnaire):
+        return questions
+    if isinstance(questions, str):
+        return REGISTRY[questions]
+    questions = tuple((f, t) for f, t in questions)
+    return _BY_QUESTIONS.get(questions) or compile_questionnaire("", "", questions)
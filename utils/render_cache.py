@@ -0,0 +1,88 @@
+"""Content-addressed cache for rendered chart images.
+
+Entries are keyed by a hash of the chart kind, its input values and render
+options. Hits are served from an in-process LRU; when IMPACT_RENDER_CACHE_DIR
+is set, rendered bytes are also written there so every worker process on the
+host can reuse them.
+"""
+import hashlib, json, os, pathlib, tempfile, threading
+from collections import OrderedDict
+from utils.metrics import incr
+
+CACHE_VERSION = 1
+
+class RenderCache:
+    def __init__(self, max_entries: int = 256, disk_dir: str | None = None):
+        self.max_entries = max_entries
+        self.disk_dir = pathlib.Path(disk_dir) if disk_dir else None
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @staticmethod
+    def key(kind: str, labels, values, **options) -> str:
+        payload = json.dumps([CACHE_VERSION, kind, list(labels), [float(v) for v in values], options],
+                             ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key: str):
+        return self.disk_dir / key[:2] / f"{key}.bin"
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                return data
+        if self.disk_dir:
+            try:
+                data = self._disk_path(key).read_bytes()
+            except OSError:
+                return None
+            self._remember(key, data)
+            return data
+        return None
+
+    def _remember(self, key: str, data: bytes):
+        with self._lock:
+            self._mem[key] = data
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    def put(self, key: str, data: bytes):
+        self._remember(key, data)
+        if self.disk_dir:
+            target = self._disk_path(key)
+            try:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(data)
+                os.replace(tmp, target)
+            except OSError:
+                pass
+
+    def get_or_render(self, key: str, render) -> bytes:
+        data = self.get(key)
+        with self._lock:
+            if data is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if data is not None:
+            incr("render_cache_hits")
+            return data
+        incr("render_cache_misses")
+        data = render()
+        self.put(key, data)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+
+render_cache = RenderCache(
+    max_entries=int(os.environ.get("IMPACT_RENDER_CACHE_SIZE", "256")),
+    disk_dir=os.environ.get("IMPACT_RENDER_CACHE_DIR") or None,
+)
@@ -0,0 +1,79 @@
+"""Result tables and PDF reports for both questionnaires.
+
+matplotlib and reportlab are imported inside the functions that need them,
+so pages that only show tables never load them.
+"""
+import pandas as pd
+from utils.questionnaires import FAMILY_IMPACT, LEGACY_READINESS
+from utils.scoring import compute_family_impact_scores, interpret_scores, compute_legacy_readiness
+
+PERCENTILE_COLUMN = "同儕百分位(平均分高於 %)"
+
+def _with_percentiles(df, percentiles):
+    if percentiles is not None:
+        df[PERCENTILE_COLUMN] = [int(round(p)) for p in percentiles]
+    return df
+
+def family_impact_table(scores, percentiles=None):
+    return _with_percentiles(pd.DataFrame({
+        "面向": list(scores.keys()),
+        f"總分(滿分{FAMILY_IMPACT.max_scores[0]})": [v["sum"] for v in scores.values()],
+        "平均(1-5)": [round(v["avg"], 2) for v in scores.values()],
+    }), percentiles)
+
+def legacy_readiness_table(domains, risk, percentiles=None):
+    return _with_percentiles(pd.DataFrame({
+        "面向": list(domains.keys()),
+        f"總分(滿分{LEGACY_READINESS.max_scores[0]})": [v["sum"] for v in domains.values()],
+        "平均(1-5)": [round(v["avg"], 2) for v in domains.values()],
+        "風險值(0-4, 越高越需留意)": [risk[k] for k in domains.keys()],
+    }), percentiles)
+
+def family_impact_pdf(scores, summary, df, png=None) -> bytes:
+    """PDF report; the radar goes in as vector graphics unless `png` is given."""
+    from utils.pdf_utils import build_report
+    from utils.pdf_charts import radar_drawing
+    from utils.fonts import pdf_font_name
+    chart = png if png is not None else radar_drawing(scores, pdf_font_name())
+    return build_report(
+        title="家族影響力指數｜分析報告",
+        subtitle="雷達圖・面向分析・顧問下一步建議",
+        summary_text=summary,
+        advisor_actions=interpret_scores(scores),
+        tables=[("分數明細", df)],
+        images=[("家族影響力雷達圖", chart)],
+    )
+
+def legacy_readiness_pdf(risk, summary, actions, df, png=None) -> bytes:
+    """PDF report; the heatmap goes in as vector graphics unless `png` is given."""
+    from utils.pdf_utils import build_report
+    from utils.pdf_charts import heatmap_drawing
+    from utils.fonts import pdf_font_name
+    chart = png if png is not None else heatmap_drawing(risk, pdf_font_name())
+    return build_report(
+        title="傳承準備度測驗｜分析報告",
+        subtitle="風險熱力圖・分數摘要・顧問下一步建議",
+        summary_text=summary,
+        advisor_actions=actions,
+        tables=[("分數與風險值", df)],
+        images=[("傳承風險熱力圖", chart)],
+    )
+
+def family_impact_report(answers, raster: bool = False) -> bytes:
+    """Score one respondent and return the full family impact PDF."""
+    from utils.charts import radar_png
+    scores, summary = compute_family_impact_scores(FAMILY_IMPACT, answers)
+    return family_impact_pdf(scores, summary, family_impact_table(scores),
+                             radar_png(scores) if raster else None)
+
+def legacy_readiness_report(answers, raster: bool = False) -> bytes:
+    """Score one respondent and return the full legacy readiness PDF."""
+    from utils.charts import heatmap_png
+    domains, risk, summary, actions = compute_legacy_readiness(LEGACY_READINESS, answers)
+    return legacy_readiness_pdf(risk, summary, actions, legacy_readiness_table(domains, risk),
+                                heatmap_png(risk) if raster else None)
+
+REPORT_BUILDERS = {
+    "family_impact": family_impact_report,
+    "legacy_readiness": legacy_readiness_report,
+}
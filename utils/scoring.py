@@ -1,60 +1,190 @@
 
 from typing import Dict, List, Tuple
+import numpy as np
+from utils.questionnaires import FAMILY_IMPACT, LEGACY_READINESS, get_questionnaire
+from utils.advice import FAMILY_IMPACT_ADVICE, LEGACY_READINESS_ACTIONS, RULE_SETS, advice_text, advice_texts, evaluate, evaluate_one
+from utils.outcome_table import outcome_table
 
-def compute_family_impact_scores(questions: List[Tuple[str, str]], answers: List[int]):
-    facets = {}
-    for (facet, _), score in zip(questions, answers):
-        bucket = facets.setdefault(facet, {"sum": 0, "cnt": 0})
-        bucket["sum"] += int(score)
-        bucket["cnt"] += 1
-    for facet, v in facets.items():
-        v["avg"] = v["sum"] / max(1, v["cnt"])
-
-    strength = [f for f, v in facets.items() if v["avg"] >= 4.0]
-    mid = [f for f, v in facets.items() if 3.0 <= v["avg"] < 4.0]
-    weak = [f for f, v in facets.items() if v["avg"] < 3.0]
+def score_matrix(questions, answers) -> Dict[str, object]:
+    """Score a (respondents x questions) answer matrix in one vectorized pass.
+
+    `questions` is a registry key, a compiled Questionnaire or a question list;
+    `answers` may be a list of lists, a NumPy array or a DataFrame whose columns
+    follow the question order. Returns the facet order plus per-facet
+    `sum` / `cnt` / `avg` / `risk` arrays shaped (respondents x facets).
+    """
+    q = get_questionnaire(questions)
+    m = np.asarray(answers, dtype=np.int64)
+    if m.ndim == 1:
+        m = m.reshape(1, -1)
+    if m.shape[1] < len(q.questions):
+        q = get_questionnaire(q.questions[:m.shape[1]])
+    m = m[:, :len(q.questions)]
+    return score_sums(q, m @ q.onehot)
+
+def score_sums(questions, sums) -> Dict[str, object]:
+    """The score_matrix result for already-summed facets (one row or respondents x facets)."""
+    q = get_questionnaire(questions)
+    sums = np.asarray(sums, dtype=np.int64).reshape(-1, len(q.facets))
+    avgs = sums / np.maximum(1, q.facet_counts)
+    return {
+        "facets": list(q.facets),
+        "sum": sums,
+        "cnt": np.broadcast_to(q.facet_counts, sums.shape),
+        "avg": avgs,
+        "risk": np.round(5 - avgs, 2),
+    }
+
+# Tier 0/1/2 = metric >= first threshold / >= second threshold / below both.
+TIER_SPECS = {
+    "family_impact": ("avg", ("strength", "mid")),
+    "legacy_readiness": ("risk", ("high_risk", "mid_risk")),
+}
+
+def facet_tiers(questions, batch: Dict[str, object]) -> np.ndarray:
+    """(respondents x facets) int8 tier of each facet, per the questionnaire's thresholds."""
+    q = get_questionnaire(questions)
+    metric, names = TIER_SPECS[q.key]
+    hi, lo = (q.thresholds[n] for n in names)
+    v = np.asarray(batch[metric])
+    return np.where(v >= hi, 0, np.where(v >= lo, 1, 2)).astype(np.int8)
+
+def summary_ids(questions, batch: Dict[str, object]):
+    """(texts, ids): the summary text only depends on the tier pattern, so each
+    distinct pattern is rendered once and respondents get an index into `texts`."""
+    q = get_questionnaire(questions)
+    _, first, ids = np.unique(facet_tiers(q, batch), axis=0, return_index=True, return_inverse=True)
+    texts = []
+    for row in first:
+        if q.key == "family_impact":
+            texts.append(family_impact_summary({f: {"avg": float(batch["avg"][row, j])} for j, f in enumerate(batch["facets"])}))
+        else:
+            texts.append(legacy_readiness_summary({f: float(batch["risk"][row, j]) for j, f in enumerate(batch["facets"])})[1])
+    return texts, np.ravel(ids).astype(np.int32)
+
+def summarize_matrix(questions, batch: Dict[str, object]) -> List[str]:
+    texts, ids = summary_ids(questions, batch)
+    return [texts[i] for i in ids]
+
+def batch_outcomes(questions, batch: Dict[str, object]) -> Tuple[List[str], List[str]]:
+    """(summaries, advice) per respondent: one outcome-table index when the table is
+    enabled and the batch covers every question, otherwise computed from the batch."""
+    q = get_questionnaire(questions)
+    full = batch["facets"] == list(q.facets) and np.array_equal(batch["cnt"][:1], q.facet_counts[None])
+    table = outcome_table(q) if full else None
+    rows = table.index(batch["sum"]) if table is not None else None
+    if rows is not None:
+        return [table.summaries[i] for i in table.summary_id[rows]], [table.advice[m] for m in table.advice_mask[rows]]
+    if not len(batch["sum"]):
+        return [], []
+    rules = RULE_SETS[q.key]
+    return summarize_matrix(q, batch), advice_texts(rules, evaluate(rules, batch[rules.metric]))
+
+def sums_outcome(questions, sums):
+    """(risk, summary, advice) for one respondent's facet sums."""
+    batch = score_sums(questions, sums)
+    summaries, advice = batch_outcomes(questions, batch)
+    return {f: float(batch["risk"][0, j]) for j, f in enumerate(batch["facets"])}, summaries[0], advice[0]
+
+def facet_averages(questions, sums) -> np.ndarray:
+    """Facet averages from stored facet sums (one row or a respondents x facets matrix)."""
+    return np.asarray(sums, dtype=float) / np.maximum(1, get_questionnaire(questions).facet_counts)
+
+def aggregate_members(questions, answers) -> Dict[str, object]:
+    """Family aggregate over a (members x questions) answer matrix.
+
+    Per-facet mean / std / min / max of member averages, and an alignment score
+    per facet (1 = everyone agrees, 0 = maximal spread on the 1-5 scale) plus
+    its overall mean.
+    """
+    batch = score_matrix(questions, answers)
+    avgs = batch["avg"]
+    std = avgs.std(axis=0)
+    alignment = 1 - std / 2.0   # population std of values in [1, 5] is at most 2
+    return {
+        "facets": batch["facets"],
+        "member_avg": avgs,
+        "mean": avgs.mean(axis=0),
+        "std": std,
+        "min": avgs.min(axis=0),
+        "max": avgs.max(axis=0),
+        "alignment": alignment,
+        "overall_alignment": float(alignment.mean()) if alignment.size else 1.0,
+    }
+
+def _facet_dict(batch: Dict[str, object], row: int) -> Dict[str, Dict[str, float]]:
+    return {
+        f: {"sum": int(batch["sum"][row, j]), "cnt": int(batch["cnt"][row, j]), "avg": float(batch["avg"][row, j])}
+        for j, f in enumerate(batch["facets"])
+    }
+
+class FacetTally:
+    """Running per-facet sums for one respondent; `update` is O(1) per changed answer."""
+
+    def __init__(self, questions, default: int = 3):
+        q = get_questionnaire(questions)
+        self.facets = list(q.facets)
+        self.index = q.facet_index.tolist()
+        self.cnts = q.facet_counts.tolist()
+        self.answers = [int(default)] * len(q.questions)
+        self.sums = [int(default) * c for c in self.cnts]
+        self.version = 0
+
+    def update(self, question: int, score: int) -> bool:
+        score = int(score)
+        old = self.answers[question]
+        if score == old:
+            return False
+        self.answers[question] = score
+        self.sums[self.index[question]] += score - old
+        self.version += 1
+        return True
+
+    def scores(self) -> Dict[str, Dict[str, float]]:
+        return {f: {"sum": s, "cnt": c, "avg": s / max(1, c)} for f, s, c in zip(self.facets, self.sums, self.cnts)}
+
+def family_impact_summary(facets: Dict[str, Dict[str, float]]) -> str:
+    hi, lo = FAMILY_IMPACT.thresholds["strength"], FAMILY_IMPACT.thresholds["mid"]
+    strength = [f for f, v in facets.items() if v["avg"] >= hi]
+    mid = [f for f, v in facets.items() if lo <= v["avg"] < hi]
+    weak = [f for f, v in facets.items() if v["avg"] < lo]
 
     parts = []
     if strength: parts.append(f"優勢面向：{'、'.join(strength)}。")
     if mid: parts.append(f"可優化面向：{'、'.join(mid)}。")
     if weak: parts.append(f"優先改善面向：{'、'.join(weak)}。")
 
-    summary = " ".join(parts) or "尚無資料。請完成作答以產出分析。"
-    return facets, summary
+    return " ".join(parts) or "尚無資料。請完成作答以產出分析。"
+
+def compute_family_impact_scores(questions: List[Tuple[str, str]], answers: List[int]):
+    batch = score_matrix(questions, [answers])
+    return _facet_dict(batch, 0), batch_outcomes(questions, batch)[0][0]
 
 def interpret_scores(scores: Dict[str, Dict[str, float]]) -> str:
-    advice = []
+    # answer-level scores (with integer facet sums) can use the outcome table; family means cannot
+    facets = list(FAMILY_IMPACT.facets)
+    table = outcome_table(FAMILY_IMPACT) if list(scores) == facets and all("sum" in v for v in scores.values()) else None
+    advice = table.advice_for([[scores[f]["sum"] for f in facets]]) if table is not None else None
+    if advice is not None:
+        return advice[0]
     avg = {k: v["avg"] for k, v in scores.items()}
-
-    if avg.get("情感連結", 0) < 3:
-        advice.append("• 先安排一次以「價值觀與家族期待」為主的會議，避免一開始聚焦在稅務或產品。")
-    if avg.get("財務參與度", 0) < 3.5:
-        advice.append("• 建立資產列表與決策流程（誰參與、如何紀錄），提升透明度與參與感。")
-    if avg.get("家族角色認同", 0) < 3.5:
-        advice.append("• 明確界定角色與授權（董事會、家族委員會、受託人等），降低決策壓力集中。")
-    if avg.get("傳承願景", 0) < 3.5:
-        advice.append("• 用 OKR/願景版把 3-5 年目標寫下來，安排交棒時程與里程碑。")
-
-    if not advice:
-        advice.append("• 建議直接進入《傳承策略設計》與保單/信託現金流模型，建立長期護城河。")
-
-    advice.append("• 若需協助，我們可提供顧問會議與策略落地服務（Email：123@gracefo.com）。")
-    return "\n".join(advice)
+    return advice_text(FAMILY_IMPACT_ADVICE, evaluate_one(FAMILY_IMPACT_ADVICE, avg))
 
 def compute_legacy_readiness(questions: List[Tuple[str, str]], answers: List[int]):
-    domains = {}
-    for (domain, _), score in zip(questions, answers):
-        bucket = domains.setdefault(domain, {"sum": 0, "cnt": 0})
-        bucket["sum"] += int(score)
-        bucket["cnt"] += 1
-    for d, v in domains.items():
-        v["avg"] = v["sum"] / max(1, v["cnt"])
+    batch = score_matrix(questions, [answers])
+    summaries, actions = batch_outcomes(questions, batch)
+    risk = {d: float(batch["risk"][0, j]) for j, d in enumerate(batch["facets"])}
+    return _facet_dict(batch, 0), risk, summaries[0], actions[0]
 
-    risk = {d: round(5 - v["avg"], 2) for d, v in domains.items()}
+def legacy_readiness_risk(domains: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    return {d: round(5 - v["avg"], 2) for d, v in domains.items()}
 
-    high_risk = [d for d, r in risk.items() if r >= 2.0]
-    mid_risk = [d for d, r in risk.items() if 1.0 <= r < 2.0]
-    low_risk = [d for d, r in risk.items() if r < 1.0]
+def legacy_readiness_summary(risk: Dict[str, float]):
+    """Return (risk, summary, actions) for a facet -> risk mapping."""
+    hi, lo = LEGACY_READINESS.thresholds["high_risk"], LEGACY_READINESS.thresholds["mid_risk"]
+    high_risk = [d for d, r in risk.items() if r >= hi]
+    mid_risk = [d for d, r in risk.items() if lo <= r < hi]
+    low_risk = [d for d, r in risk.items() if r < lo]
 
     parts = []
     if high_risk: parts.append(f"高風險：{'、'.join(high_risk)}（建議立即安排顧問會議）")
@@ -62,17 +192,4 @@ def compute_legacy_readiness(questions: List[Tuple[str, str]], answers: List[int
     if low_risk: parts.append(f"低風險：{'、'.join(low_risk)}（維持並定期檢視）")
     summary = "；".join(parts) or "尚無資料。"
 
-    actions = []
-    if risk.get("資產透明度", 0) >= 1.0:
-        actions.append("• 建立最新資產清單與權屬（含跨境資產），指定維護頻率與責任人。")
-    if risk.get("稅務與合規", 0) >= 1.0:
-        actions.append("• 進行跨境稅務/申報盤點（CRS/FBAR/遺贈稅），建立年度合規清單。")
-    if risk.get("接班計畫", 0) >= 1.0:
-        actions.append("• 設定交棒時程表與角色授權，建立家族治理/董事會會議節奏。")
-    if risk.get("保險與信託", 0) >= 1.0:
-        actions.append("• 用保單/信託打造長期現金流與風險隔離，定期壓力測試。")
-    if not actions:
-        actions.append("• 建議直接進入《傳承策略設計》與現金流模型優化，建立長期護城河。")
-    actions.append("• 需要協助？來信 123@gracefo.com 安排顧問會議。")
-
-    return domains, risk, summary, "\n".join(actions)
+    return risk, summary, advice_text(LEGACY_READINESS_ACTIONS, evaluate_one(LEGACY_READINESS_ACTIONS, risk))
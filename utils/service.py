@@ -0,0 +1,210 @@
+"""Scoring HTTP service (plain ASGI) for the CRM and other internal systems.
+
+    python -m utils.service --port 8600          # served by uvicorn (in requirements.txt)
+    uvicorn utils.service:app --port 8600        # same app under any ASGI server
+
+    GET  /health
+    GET  /v1/questionnaires                        keys, titles, questions, facets
+    POST /v1/{questionnaire}/score                 {"answers": [1-5, ...], "render": ["png", "pdf"]}
+    POST /v1/{questionnaire}/batch                 {"responses": [{"id": "...", "answers": [...]}, ...], "render": [...]}
+    POST /v1/{questionnaire}/report                {"answers": [...]}  ->  application/pdf
+
+Scoring, summaries and advice come from the same `utils` code as the pages
+and are computed inline (a batch is one vectorized pass). Charts and PDFs are
+rendered in a process pool (IMPACT_SERVICE_WORKERS, default: all cores) so
+the event loop keeps serving while they are built; rendered bytes are
+returned base64-encoded.
+"""
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import argparse, asyncio, base64, json, re, sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from utils.questionnaires import REGISTRY
+from utils.scoring import batch_outcomes, score_matrix
+from utils.procpool import spawn_pool
+
+MAX_BODY = 16 * 1024 * 1024
+MAX_BATCH = 10_000
+MAX_RENDER = 500           # responses per batch that may ask for charts/PDFs
+RENDER_KINDS = ("png", "pdf")
+ROUTE = re.compile(r"^/v1/(?P<questionnaire>[a-z_]+)/(?P<action>score|batch|report)$")
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def _render(questionnaire: str, answers, kinds):
+    """Worker-process side: chart PNG and/or PDF bytes for one respondent."""
+    from utils.reports import REPORT_BUILDERS
+    out = {}
+    if "png" in kinds:
+        if questionnaire == "family_impact":
+            from utils.scoring import compute_family_impact_scores
+            from utils.charts import radar_png
+            out["png"] = radar_png(compute_family_impact_scores(questionnaire, answers)[0])
+        else:
+            from utils.scoring import compute_legacy_readiness
+            from utils.charts import heatmap_png
+            out["png"] = heatmap_png(compute_legacy_readiness(questionnaire, answers)[1])
+    if "pdf" in kinds:
+        out["pdf"] = REPORT_BUILDERS[questionnaire](answers)
+    return out
+
+_pool = None
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        workers = int(os.environ.get("IMPACT_SERVICE_WORKERS", "0")) or os.cpu_count() or 1
+        _pool = spawn_pool(workers)
+    return _pool
+
+def _answer_matrix(q, rows) -> np.ndarray:
+    try:
+        matrix = np.array(rows)
+    except ValueError:
+        raise HTTPError(422, "every answers list must have the same length")
+    n = len(q.questions)
+    if matrix.ndim != 2 or matrix.shape[1] != n:
+        raise HTTPError(422, f"answers must be lists of {n} integers")
+    if matrix.dtype.kind not in "iu" or (matrix < 1).any() or (matrix > 5).any():
+        raise HTTPError(422, "answers must be integers from 1 to 5")
+    return matrix.astype(np.int64)
+
+def _render_kinds(body) -> tuple:
+    kinds = body.get("render") or []
+    if isinstance(kinds, str):
+        kinds = [kinds]
+    unknown = [k for k in kinds if k not in RENDER_KINDS]
+    if unknown:
+        raise HTTPError(422, f"unknown render kind(s): {', '.join(map(str, unknown))}")
+    return tuple(kinds)
+
+def score_batch(q, ids, matrix):
+    """JSON-ready results for a (respondents x questions) answer matrix."""
+    batch = score_matrix(q, matrix)
+    summaries, advice = batch_outcomes(q, batch)
+    sums, avgs, risk = batch["sum"].tolist(), np.round(batch["avg"], 4).tolist(), batch["risk"].tolist()
+    with_risk = q.key == "legacy_readiness"
+    def facets(i):
+        return [{"facet": f, "sum": s, "avg": a, **({"risk": r} if with_risk else {})}
+                for f, s, a, r in zip(q.facets, sums[i], avgs[i], risk[i])]
+    return [{
+        "id": rid,
+        "facets": facets(i),
+        "summary": summaries[i],
+        "advice": advice[i],
+    } for i, rid in enumerate(ids)]
+
+async def _with_renders(q, results, matrix, kinds):
+    if not kinds:
+        return results
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    rendered = await asyncio.gather(*(loop.run_in_executor(pool, _render, q.key, row, kinds) for row in matrix.tolist()))
+    for result, files in zip(results, rendered):
+        result.update({k: base64.b64encode(v).decode("ascii") for k, v in files.items()})
+    return results
+
+async def handle(method: str, path: str, body: bytes):
+    """Route one request; returns (status, content type, payload bytes)."""
+    if path == "/health":
+        return 200, "application/json", b'{"status":"ok"}'
+    if path == "/v1/questionnaires":
+        if method != "GET":
+            raise HTTPError(405, "use GET")
+        data = [{"key": q.key, "title": q.title, "facets": list(q.facets),
+                 "questions": [{"no": i, "facet": f, "text": t} for i, (f, t) in enumerate(q.questions, start=1)]}
+                for q in REGISTRY.values()]
+        return 200, "application/json", json.dumps(data, ensure_ascii=False).encode("utf-8")
+    m = ROUTE.match(path)
+    if not m:
+        raise HTTPError(404, "not found")
+    if method != "POST":
+        raise HTTPError(405, "use POST")
+    q = REGISTRY.get(m["questionnaire"])
+    if q is None:
+        raise HTTPError(404, f"unknown questionnaire: {m['questionnaire']}")
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "body must be JSON")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "body must be a JSON object")
+
+    if m["action"] == "batch":
+        responses = payload.get("responses")
+        if not isinstance(responses, list) or not all(isinstance(r, dict) for r in responses):
+            raise HTTPError(422, "responses must be a list of objects with an answers list")
+        if len(responses) > MAX_BATCH:
+            raise HTTPError(413, f"at most {MAX_BATCH} responses per batch")
+        kinds = _render_kinds(payload)
+        if kinds and len(responses) > MAX_RENDER:
+            raise HTTPError(413, f"at most {MAX_RENDER} responses per batch when rendering")
+        ids = [str(r.get("id", i)) for i, r in enumerate(responses, start=1)]
+        matrix = _answer_matrix(q, [r.get("answers") for r in responses]) if responses else np.empty((0, len(q.questions)), np.int64)
+        results = await _with_renders(q, score_batch(q, ids, matrix), matrix, kinds)
+        data = {"questionnaire": q.key, "count": len(results), "results": results}
+        return 200, "application/json", json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    matrix = _answer_matrix(q, [payload.get("answers")])
+    if m["action"] == "report":
+        files = await asyncio.get_running_loop().run_in_executor(_get_pool(), _render, q.key, matrix[0].tolist(), ("pdf",))
+        return 200, "application/pdf", files["pdf"]
+    result = (await _with_renders(q, score_batch(q, [str(payload.get("id", 1))], matrix), matrix, _render_kinds(payload)))[0]
+    return 200, "application/json", json.dumps(result, ensure_ascii=False).encode("utf-8")
+
+async def _read_body(receive) -> bytes:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY:
+            raise HTTPError(413, "request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if _pool is not None:
+                    _pool.shutdown(cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+    try:
+        status, ctype, payload = await handle(scope["method"], scope["path"], await _read_body(receive))
+    except HTTPError as e:
+        status, ctype, payload = e.status, "application/json", json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", ctype.encode()), (b"content-length", str(len(payload)).encode())]})
+    await send({"type": "http.response.body", "body": payload})
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve questionnaire scoring over HTTP.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8600)
+    ap.add_argument("--workers", "-j", type=int, default=None, help="render processes (default: all cores)")
+    args = ap.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        print("the scoring service needs an ASGI server: pip install uvicorn", file=sys.stderr)
+        return 1
+    if args.workers:
+        os.environ["IMPACT_SERVICE_WORKERS"] = str(args.workers)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="info")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""Opt-in, append-only response store.
+
+Only active when IMPACT_STORE_PATH points at a SQLite file. Raw answers and
+facet sums are stored as compact uint8 blobs, indexed by questionnaire +
+family id / session id + timestamp. `submit` only enqueues; a background
+thread writes queued rows in batches (one transaction each), so the
+Streamlit script thread never waits on disk.
+"""
+import atexit, logging, os, queue, sqlite3, threading, time
+import numpy as np
+
+log = logging.getLogger(__name__)
+RETRY_MAX_DELAY = 5.0       # seconds between attempts while the database stays locked/unwritable
+RETRIES_AFTER_CLOSE = 5     # attempts left for a failing batch once close() was called
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    id INTEGER PRIMARY KEY,
+    questionnaire TEXT NOT NULL,
+    family_id TEXT,
+    session_id TEXT,
+    created_at REAL NOT NULL,
+    answers BLOB NOT NULL,
+    facet_sums BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_responses_family ON responses(questionnaire, family_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_responses_session ON responses(questionnaire, session_id, created_at);
+"""
+
+def _connect(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+class ResponseStore:
+    def __init__(self, path, batch_size: int = 256, flush_interval: float = 0.5):
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._closed = threading.Event()
+        # one read connection shared by all script threads (Streamlit runs each rerun on a new thread)
+        self._reader, self._reader_lock = None, threading.Lock()
+        _connect(self.path).close()
+        self._writer = threading.Thread(target=self._run, name="response-store-writer", daemon=True)
+        self._writer.start()
+
+    def submit(self, questionnaire: str, answers, facet_sums, family_id: str | None = None,
+               session_id: str | None = None, created_at: float | None = None):
+        """Queue one response for writing; never blocks on I/O. Returns its timestamp."""
+        created_at = created_at or time.time()
+        self._queue.put((
+            questionnaire, family_id or None, session_id or None, created_at,
+            np.asarray(answers, dtype=np.uint8).tobytes(), np.asarray(facet_sums, dtype=np.uint8).tobytes(),
+        ))
+        return created_at
+
+    def _drain(self, first):
+        rows, marks = [], []
+        item = first
+        while True:
+            (marks if isinstance(item, threading.Event) else rows).append(item)
+            if len(rows) >= self.batch_size:
+                break
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+        return rows, marks
+
+    def _write(self, conn, rows) -> bool:
+        """Insert one batch, retrying until it is committed. Gives up (False) only
+        when the store is closing and the batch still fails."""
+        attempt = 0
+        while True:
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO responses (questionnaire, family_id, session_id, created_at, answers, facet_sums)"
+                        " VALUES (?, ?, ?, ?, ?, ?)", rows)
+                return True
+            except sqlite3.OperationalError as e:
+                attempt += 1
+                if self._closed.is_set() and attempt >= RETRIES_AFTER_CLOSE:
+                    log.error("response store %s: dropping %d unwritten rows on close: %s", self.path, len(rows), e)
+                    return False
+                delay = min(RETRY_MAX_DELAY, 0.2 * attempt)
+                log.warning("response store %s: writing %d rows failed (%s), retry %d in %.1fs",
+                            self.path, len(rows), e, attempt, delay)
+                time.sleep(delay)
+
+    def _run(self):
+        conn = _connect(self.path)
+        try:
+            while not (self._closed.is_set() and self._queue.empty()):
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                rows, marks = self._drain(first)
+                if rows and not self._write(conn, rows):
+                    continue            # not persisted: flush() waiting on these marks times out (False)
+                for m in marks:
+                    m.set()
+        finally:
+            conn.close()
+
+    def flush(self, timeout: float | None = 10.0) -> bool:
+        """Block until everything submitted so far is written (tools/tests; not for page code)."""
+        mark = threading.Event()
+        self._queue.put(mark)
+        return mark.wait(timeout)
+
+    def close(self, timeout: float | None = 10.0):
+        self._closed.set()
+        self._writer.join(timeout)
+        with self._reader_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def history(self, questionnaire: str, family_id: str | None = None, session_id: str | None = None,
+                before: float | None = None, limit: int = 8):
+        """Most recent responses (newest first) for a family id, or else a session id.
+
+        Served by the (questionnaire, family_id|session_id, created_at) indexes, so
+        the cost depends on `limit`, not on the archive size.
+        """
+        column, value = ("family_id", family_id) if family_id else ("session_id", session_id)
+        if not value:
+            return []
+        with self._reader_lock:
+            if self._reader is None:
+                self._reader = _connect(self.path)
+            rows = self._reader.execute(
+                f"SELECT created_at, answers, facet_sums FROM responses"
+                f" WHERE questionnaire = ? AND {column} = ? AND created_at < ?"
+                f" ORDER BY created_at DESC LIMIT ?",
+                (questionnaire, value, before if before is not None else float("inf"), int(limit)),
+            ).fetchall()
+        return [{"created_at": t, "answers": np.frombuffer(a, dtype=np.uint8).astype(np.int64),
+                 "facet_sums": np.frombuffer(f, dtype=np.uint8).astype(np.int64)} for t, a, f in rows]
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store() -> ResponseStore | None:
+    """The process-wide store, or None when persistence is not enabled."""
+    global _store
+    path = os.environ.get("IMPACT_STORE_PATH")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ResponseStore(path)
+            atexit.register(_store.close)
+        return _store
@@ -1,5 +1,5 @@
 
-import os
+import hashlib, os, re
 import streamlit as st
 
 def brand_header(subtitle: str = ""):
@@ -21,6 +21,20 @@ def brand_header(subtitle: str = ""):
         )
     st.divider()
 
+@st.cache_resource(show_spinner=False)
+def _warm_up_thread():
+    import threading
+    from utils.warmup import warm_up
+    thread = threading.Thread(target=warm_up, name="impact-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+def start_warm_up():
+    """Warm up this server process once, in the background (see utils.warmup)."""
+    from utils.warmup import enabled
+    if enabled():
+        _warm_up_thread()
+
 def render_sidebar_nav():
     """Hide Streamlit default Pages nav then render Chinese labels."""
     st.markdown(
@@ -36,3 +50,162 @@ def render_sidebar_nav():
         st.page_link("app.py", label="首頁", icon="🏠")
         st.page_link("pages/01_family_impact.py", label="家族影響力指數", icon="🧭")
         st.page_link("pages/02_legacy_readiness.py", label="傳承準備度測驗", icon="🧪")
+        if is_admin():
+            st.page_link("pages/03_cohort_jobs.py", label="家族彙整批次作業", icon="🗂️")
+
+def session_id() -> str:
+    """Random per-browser-session id (no personal data)."""
+    if "session_id" not in st.session_state:
+        import uuid
+        st.session_state["session_id"] = uuid.uuid4().hex
+    return st.session_state["session_id"]
+
+FAMILY_CODE = re.compile(r"[A-Za-z0-9_-]{22}")     # secrets.token_urlsafe(16)
+
+def family_key(code: str) -> str:
+    """What the store keeps for a family lookup code (a hash, never the code itself)."""
+    return hashlib.sha256(b"impact-family\0" + code.encode("utf-8")).hexdigest()
+
+def store_opt_in(prefix: str):
+    """Opt-in controls for keeping answers; returns (keep, family key).
+
+    Family history is keyed by a random lookup code the app issues on the first
+    save (shown once, stored only as a hash), so a guessed family name cannot
+    reveal anyone's results. Renders nothing and returns (False, None) unless a
+    response store is configured.
+    """
+    from utils.store import get_store
+    if get_store() is None:
+        return False, None
+    keep = st.checkbox("同意保存本次作答（僅供日後追蹤比較，可隨時要求刪除）", key=f"{prefix}_keep")
+    code = st.text_input("家族查詢碼（選填：輸入先前取得的查詢碼，以比較家族歷次結果）", key=f"{prefix}_family").strip()
+    if code and not FAMILY_CODE.fullmatch(code):
+        st.warning("查詢碼格式不正確，請輸入本平台提供的 22 碼查詢碼。")
+        code = ""
+    if keep and not code:
+        import secrets
+        code = st.session_state.setdefault("family_code", secrets.token_urlsafe(16))
+        st.caption(f"本次作答的家族查詢碼：`{code}`　請妥善保存，日後輸入即可比較歷次結果。")
+    return keep, (family_key(code) if code else None)
+
+def save_response(questionnaire_key: str, tally, family_id: str | None):
+    """Hand the tallied answers to the background store writer (non-blocking).
+
+    Resubmitting unchanged answers in the same session is not stored twice.
+    """
+    from utils.store import get_store
+    store = get_store()
+    saved = st.session_state.setdefault("saved_versions", {})
+    if store is not None and saved.get(questionnaire_key) != (tally.version, family_id):
+        saved[questionnaire_key] = (tally.version, family_id)
+        st.session_state.setdefault("saved_at", {})[questionnaire_key] = store.submit(
+            questionnaire_key, tally.answers, tally.sums, family_id=family_id, session_id=session_id())
+
+def cohort_opt_in(prefix: str) -> bool:
+    """Consent control for the anonymous peer benchmark; False (and nothing rendered) when it is not configured."""
+    from utils.cohort import get_cohort
+    if get_cohort() is None:
+        return False
+    return st.checkbox("同意將本次分數匿名納入同儕比較統計（僅累計各面向分數分布，不保存作答）", key=f"{prefix}_cohort")
+
+def count_in_cohort(questionnaire_key: str, tally, share: bool):
+    """Count this session's submission in the anonymous cohort when it opted in
+    (replacing its earlier one); withdrawing consent un-counts it again."""
+    from utils.cohort import get_cohort
+    cohort = get_cohort()
+    if cohort is None:
+        return
+    counted = st.session_state.setdefault("cohort_counted", {})
+    prev = counted.get(questionnaire_key)
+    if share and (prev is None or prev[0] != tally.version):
+        cohort.add(questionnaire_key, tally.sums, previous=None if prev is None else prev[1])
+        counted[questionnaire_key] = (tally.version, list(tally.sums))
+    elif not share and prev is not None:
+        cohort.remove(questionnaire_key, prev[1])
+        del counted[questionnaire_key]
+
+def cohort_percentiles(questionnaire_key: str, tally):
+    """Per-facet percentiles of this result within the cohort, or None if not available."""
+    from utils.cohort import get_cohort
+    cohort = get_cohort()
+    return None if cohort is None else cohort.percentiles(questionnaire_key, tally.sums)
+
+def cohort_revision(questionnaire_key: str):
+    """Changes whenever cohort_percentiles would; part of the pages' result cache key."""
+    from utils.cohort import get_cohort
+    cohort = get_cohort()
+    return None if cohort is None else cohort.revision(questionnaire_key)
+
+def history_panel(questionnaire, tally, family_id: str | None, limit: int = 4):
+    """Earlier results for this family (or browser session): per-facet deltas plus an overlay chart."""
+    from utils.store import get_store
+    store = get_store()
+    if store is None:
+        return
+    before = st.session_state.get("saved_at", {}).get(questionnaire.key)
+    past = store.history(questionnaire.key, family_id=family_id, session_id=session_id(), before=before, limit=limit)
+    if not past:
+        return
+
+    from datetime import datetime
+    import numpy as np
+    import pandas as pd
+    from utils.scoring import facet_averages
+    from utils.charts import radar_png, heatmap_png
+
+    cur = facet_averages(questionnaire, tally.sums)
+    prev = facet_averages(questionnaire, np.stack([p["facet_sums"] for p in past]))
+    dates = [datetime.fromtimestamp(p["created_at"]).strftime("%Y-%m-%d %H:%M") for p in past]
+
+    st.divider()
+    st.subheader(f"📈 歷次結果比較（最近 {len(past)} 次）")
+    col1, col2 = st.columns([1.2, 1], vertical_alignment="top")
+    with col1:
+        if questionnaire.key == "legacy_readiness":
+            risk = {f: round(5 - v, 2) for f, v in zip(questionnaire.facets, cur)}
+            history = [(d, np.round(5 - row, 2).tolist()) for d, row in zip(dates[::-1], prev[::-1])]
+            st.image(heatmap_png(risk, history=history), use_container_width=True)
+        else:
+            scores = {f: {"avg": float(v)} for f, v in zip(questionnaire.facets, cur)}
+            overlays = [(d, row.tolist()) for d, row in zip(dates, prev)]
+            st.image(radar_png(scores, overlays=overlays), use_container_width=True)
+    with col2:
+        st.dataframe(pd.DataFrame({
+            "面向": list(questionnaire.facets),
+            "本次平均": cur.round(2),
+            f"上次平均（{dates[0]}）": prev[0].round(2),
+            "變化": (cur - prev[0]).round(2),
+        }), hide_index=True, use_container_width=True)
+
+def is_admin() -> bool:
+    """True once this session has opened a page with ?admin=<IMPACT_ADMIN_TOKEN>."""
+    token = os.environ.get("IMPACT_ADMIN_TOKEN")
+    if not token:
+        return False
+    if not st.session_state.get("is_admin"):
+        import hmac
+        given = st.query_params.get("admin", "")
+        st.session_state["is_admin"] = bool(given) and hmac.compare_digest(given, token)
+    return st.session_state["is_admin"]
+
+def metrics_panel(last: int = 50):
+    """Start the configured metrics exporters; admins also get recent stage timings in the sidebar."""
+    from utils.metrics import metrics, start_exporters
+    start_exporters()
+    if not is_admin():
+        return
+    import pandas as pd
+    from datetime import datetime
+    with st.sidebar.expander("⏱️ 效能監控（管理員）"):
+        recent = metrics.snapshot()
+        if not recent:
+            st.caption("尚無紀錄。")
+            return
+        df = pd.DataFrame(recent, columns=["時間", "階段", "秒", "成功"])
+        df["毫秒"] = (df.pop("秒") * 1000).round(1)
+        st.dataframe(df.groupby("階段")["毫秒"].describe(percentiles=[0.5, 0.95])[["count", "50%", "95%", "max"]]
+                     .round(1).rename(columns={"count": "次數", "50%": "p50", "95%": "p95", "max": "最大"}),
+                     use_container_width=True)
+        df["時間"] = [datetime.fromtimestamp(t).strftime("%H:%M:%S") for t in df["時間"]]
+        st.dataframe(df.head(last), hide_index=True, use_container_width=True)
+        st.download_button("下載 Prometheus 指標", metrics.prometheus_text(), file_name="impact_metrics.prom", mime="text/plain")
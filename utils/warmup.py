@@ -0,0 +1,72 @@
+"""Process warm-up: load the heavy libraries and fonts before the first request.
+
+Pages import matplotlib, pandas and reportlab only when they first need them.
+`warm_up()` pays those costs up front instead: imports, the matplotlib and
+reportlab CJK font set-up, the outcome table (if enabled) and one default
+chart and PDF, so code paths and the render cache are hot.
+
+The app runs it once per server process on a background thread (see
+`utils.ui.start_warm_up`; IMPACT_WARM_UP=0 turns that off). Run it as a
+command at image build or container start to fill the on-disk caches
+(matplotlib's font list, a downloaded font, outcome tables, render cache):
+
+    python -m utils.warmup [--download-font]
+"""
+import os, sys, time
+from utils.metrics import timed
+
+def _libraries():
+    import numpy, pandas
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from reportlab.pdfgen import canvas
+
+def _scoring():
+    from utils.questionnaires import REGISTRY
+    from utils.outcome_table import outcome_table
+    for key in REGISTRY:
+        outcome_table(key)
+
+def _fonts():
+    from utils.fonts import apply_matplotlib_font, pdf_font_name
+    apply_matplotlib_font()
+    pdf_font_name()
+
+def _charts():
+    from utils.questionnaires import FAMILY_IMPACT, LEGACY_READINESS
+    from utils.scoring import FacetTally, legacy_readiness_risk
+    from utils.charts import radar_png, heatmap_png
+    radar_png(FacetTally(FAMILY_IMPACT).scores())             # the pages' default answers
+    heatmap_png(legacy_readiness_risk(FacetTally(LEGACY_READINESS).scores()))
+
+def _pdf():
+    from utils.questionnaires import FAMILY_IMPACT
+    from utils.reports import family_impact_report
+    family_impact_report([3] * len(FAMILY_IMPACT.questions))
+
+STEPS = [("libraries", _libraries), ("scoring", _scoring), ("fonts", _fonts), ("charts", _charts), ("pdf", _pdf)]
+
+def warm_up() -> dict:
+    """Run every warm-up step; returns seconds per step (None if a step failed)."""
+    took = {}
+    for name, step in STEPS:
+        t0 = time.perf_counter()
+        try:
+            with timed(f"warm_up_{name}"):
+                step()
+            took[name] = time.perf_counter() - t0
+        except Exception:
+            took[name] = None
+    return took
+
+def enabled() -> bool:
+    return os.environ.get("IMPACT_WARM_UP", "1").lower() not in ("0", "false", "no")
+
+if __name__ == "__main__":
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    if "--download-font" in sys.argv[1:]:
+        os.environ["IMPACT_FONT_DOWNLOAD"] = "1"
+    took = warm_up()
+    for name, s in took.items():
+        print(f"{name:10s} {'failed' if s is None else f'{s * 1000:8.1f} ms'}")
+    sys.exit(0 if all(s is not None for s in took.values()) else 1)